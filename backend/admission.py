@@ -0,0 +1,233 @@
+"""
+Admission control for the LLM-backed endpoints.
+
+  RateLimiter         per-client token buckets (rate/s refill, `burst` capacity).
+                      Buckets live in an LRU capped at `max_clients` entries of
+                      (tokens, last refill) tuples, so memory stays bounded no
+                      matter how many distinct clients show up. An evicted client
+                      simply starts over with a full bucket.
+  SharedRateLimiter   the same buckets kept in SQLite (one row per client), so
+                      every worker process on the host enforces one limit.
+  ConcurrencyLimiter  caps in-flight upstream LLM work (per process). Callers beyond the cap
+                      wait in a bounded queue for at most `queue_timeout`; when
+                      the queue is full they are shed immediately.
+
+Async callers use `await limiter.acheck(key)`: for the shared limiter that runs
+the SQLite transaction on a worker thread, so lock waits between processes never
+block the event loop. Both raise `Rejected` with a Retry-After hint; the app
+turns it into a 429 (rate limited) or 503 (overloaded) response.
+"""
+
+import asyncio
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimited(Rejected):
+    pass
+
+
+class Overloaded(Rejected):
+    pass
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float, max_clients: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.counters = {"allowed": 0, "limited": 0, "evicted": 0}
+
+    def _take(self, tokens: float, updated: float, now: float, cost: float) -> tuple[float, bool]:
+        """Refill a bucket up to `now` and try to take `cost`. Returns (tokens left, allowed)."""
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= cost:
+            self.counters["allowed"] += 1
+            return tokens - cost, True
+        self.counters["limited"] += 1
+        return tokens, False
+
+    def _reject(self, tokens: float, cost: float) -> RateLimited:
+        return RateLimited("rate limited", (cost - tokens) / self.rate if self.rate else 60.0)
+
+    def check(self, key: str, cost: float = 1.0) -> None:
+        """Take `cost` tokens from `key`'s bucket, or raise RateLimited with the wait until it could."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens, allowed = self._take(tokens, updated, now, cost)
+        self._buckets[key] = (tokens, now)  # re-inserted at the MRU end
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+            self.counters["evicted"] += 1
+        if not allowed:
+            raise self._reject(tokens, cost)
+
+    async def acheck(self, key: str, cost: float = 1.0) -> None:
+        self.check(key, cost)
+
+    def stats(self) -> dict:
+        return {**self.counters, "clients": len(self._buckets), "rate": self.rate, "burst": self.burst}
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live in a SQLite table (via SQLiteBackend.transaction),
+    keyed by limiter name + client, with wall-clock timestamps so every process agrees.
+    Buckets that have refilled completely are equivalent to absent ones and are pruned
+    periodically; beyond `max_clients` rows the least recently seen are dropped.
+    """
+
+    PRUNE_EVERY = 500   # checks between prunes
+
+    def __init__(self, backend, name: str, rate: float, burst: float, max_clients: int = 10_000):
+        super().__init__(rate, burst, max_clients)
+        self.backend = backend
+        self.name = name
+        self._checks = 0
+        backend.transaction(lambda db: db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "name TEXT NOT NULL, key TEXT NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "PRIMARY KEY (name, key))"
+        ))
+
+    def check(self, key: str, cost: float = 1.0) -> None:
+        now = time.time()
+
+        def take(db) -> tuple[float, bool]:
+            row = db.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE name = ? AND key = ?", (self.name, key)
+            ).fetchone()
+            tokens, allowed = self._take(*(row or (self.burst, now)), now, cost)
+            db.execute(
+                "INSERT OR REPLACE INTO rate_buckets (name, key, tokens, updated) VALUES (?, ?, ?, ?)",
+                (self.name, key, tokens, now),
+            )
+            return tokens, allowed
+
+        tokens, allowed = self.backend.transaction(take)
+        self._checks += 1
+        if self._checks % self.PRUNE_EVERY == 0:
+            self.prune(now)
+        if not allowed:
+            raise self._reject(tokens, cost)
+
+    async def acheck(self, key: str, cost: float = 1.0) -> None:
+        await asyncio.to_thread(self.check, key, cost)
+
+    def prune(self, now: float | None = None) -> int:
+        now = now or time.time()
+        full_after = self.burst / self.rate if self.rate else float("inf")
+
+        def prune(db) -> int:
+            removed = db.execute(
+                "DELETE FROM rate_buckets WHERE name = ? AND updated < ?", (self.name, now - full_after)
+            ).rowcount
+            removed += db.execute(
+                "DELETE FROM rate_buckets WHERE name = ? AND key IN ("
+                "SELECT key FROM rate_buckets WHERE name = ? ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                (self.name, self.name, self.max_clients),
+            ).rowcount
+            return removed
+
+        removed = self.backend.transaction(prune)
+        self.counters["evicted"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        clients = self.backend.transaction(lambda db: db.execute(
+            "SELECT COUNT(*) FROM rate_buckets WHERE name = ?", (self.name,)
+        ).fetchone()[0])
+        return {**self.counters, "clients": clients, "rate": self.rate, "burst": self.burst, "shared": True}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self._hold_ewma = 0.0  # seconds a slot is typically held → Retry-After estimate
+        self._acquired_at: dict[int, float] = {}
+        self._tickets = itertools.count()
+        self.counters = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_timeout": 0}
+        self.peak_waiting = 0
+
+    def _retry_after(self) -> float:
+        hold = self._hold_ewma or self.queue_timeout
+        return hold * (self.waiting / self.max_in_flight + 1)
+
+    async def acquire(self) -> int:
+        """Wait for a slot (bounded) or raise Overloaded. Returns a ticket for release()."""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.counters["shed_queue_full"] += 1
+                raise Overloaded("queue full", self._retry_after())
+            self.counters["queued"] += 1
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.counters["shed_timeout"] += 1
+                raise Overloaded("queue timeout", self._retry_after()) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.counters["admitted"] += 1
+        ticket = next(self._tickets)
+        self._acquired_at[ticket] = time.monotonic()
+        return ticket
+
+    def release(self, ticket: int) -> None:
+        started = self._acquired_at.pop(ticket, None)
+        if started is None:
+            return  # already released
+        held = time.monotonic() - started
+        self._hold_ewma = held if not self._hold_ewma else 0.8 * self._hold_ewma + 0.2 * held
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to `timeout` for in-flight work to finish (shutdown). True if it did."""
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.in_flight == 0
+
+    @asynccontextmanager
+    async def slot(self):
+        ticket = await self.acquire()
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "typical_hold_s": round(self._hold_ewma, 2),
+        }
@@ -0,0 +1,119 @@
+"""
+Contact delivery vs event-loop responsiveness, against a local SMTP stand-in.
+
+Starts an aiosmtpd server (with artificial per-message latency to mimic Gmail),
+points the app's outbox at it, fires a burst of /api/contact submissions through
+the ASGI app, and measures, while mail is being delivered:
+  - /api/contact response latency (should be milliseconds)
+  - event-loop lag, sampled by a ticker task (should stay near zero)
+  - SMTP connections opened vs messages delivered (session reuse)
+
+`--inline` runs the same burst through the pre-outbox code path (blocking
+smtplib connect + STARTTLS/login + send inside the handler) for comparison.
+
+Usage (from backend/, needs `pip install -r bench/requirements.txt`):
+  python bench/bench_contact_loop.py --messages 50 --smtp-delay 0.05
+  python bench/bench_contact_loop.py --messages 50 --smtp-delay 0.05 --inline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import smtplib
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("SMTP_USER", "bench@example.com")
+os.environ.setdefault("SMTP_PASS", "bench")
+os.environ.setdefault("STATE_DIR", tempfile.mkdtemp(prefix="bench-state-"))
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from bench_utils import loop_lag_sampler, pct  # noqa: E402
+from mock_upstreams import SMTPSink, start_smtp  # noqa: E402
+from outbox import SMTPSession  # noqa: E402
+
+
+async def run(args) -> dict:
+    sink = SMTPSink(args.smtp_delay)
+    controller = start_smtp(sink, args.smtp_port)
+    # Plaintext local sink: no STARTTLS, no AUTH
+    main.contact_outbox.session = SMTPSession("127.0.0.1", args.smtp_port, starttls=False)
+
+    if args.inline:
+        async def legacy_contact(msg: main.ContactMessage):
+            # The pre-outbox behaviour: fresh blocking session per submission, on the event loop
+            body = main.render_contact_email(msg)
+            with smtplib.SMTP("127.0.0.1", args.smtp_port) as server:
+                server.sendmail(main.SMTP_USER, main.RECIPIENT_EMAIL, body)
+            return {"success": True}
+        for route in main.app.router.routes:
+            if getattr(route, "path", "") == "/api/contact":
+                route.endpoint = legacy_contact
+                route.dependant.call = legacy_contact
+
+    lag: list[float] = []
+    latencies: list[float] = []
+    async with main.lifespan(main.app):
+        sampler = asyncio.create_task(loop_lag_sampler(lag))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def submit(i: int) -> None:
+                t0 = time.perf_counter()
+                resp = await client.post("/api/contact", json={
+                    "name": f"Bench {i}", "email": f"bench{i}@example.com",
+                    "subject": "Load test", "message": "hello " * 50,
+                })
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(submit(i) for i in range(args.messages)))
+            accepted_in = time.perf_counter() - started
+            # Keep sampling while the outbox drains
+            deadline = time.monotonic() + 60
+            while sink.received < args.messages and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            delivered_in = time.perf_counter() - started
+        await asyncio.sleep(0.05)  # let the sampler record any stall that just ended
+        sampler.cancel()
+        stats = await main.contact_outbox.stats()
+    controller.stop()
+
+    return {
+        "mode": "inline" if args.inline else "outbox",
+        "messages": args.messages,
+        "smtp_delay_s": args.smtp_delay,
+        "accept_p50_ms": round(pct(latencies, 0.5) * 1000, 2),
+        "accept_p99_ms": round(pct(latencies, 0.99) * 1000, 2),
+        "all_accepted_s": round(accepted_in, 3),
+        "all_delivered_s": round(delivered_in, 3),
+        "delivered": sink.received,
+        "smtp_sessions": len(sink.sessions),
+        "loop_lag_samples": len(lag),
+        "loop_lag_p99_ms": round(pct(lag, 0.99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lag, default=0.0) * 1000, 2),
+        "loop_lag_mean_ms": round(statistics.fmean(lag) * 1000, 3) if lag else 0.0,
+        "outbox": stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--smtp-delay", type=float, default=0.05, help="seconds the stand-in takes per message")
+    parser.add_argument("--smtp-port", type=int, default=8025)
+    parser.add_argument("--inline", action="store_true", help="benchmark the old blocking in-handler send")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
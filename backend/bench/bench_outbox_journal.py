@@ -0,0 +1,121 @@
+"""
+Write-throughput benchmark for the contact outbox journal (SQLite, WAL).
+
+Measures, on the real filesystem the journal will live on:
+  - single-row commits (one transaction per submission)
+  - group commits of --group rows per transaction
+  - end-to-end ContactOutbox.submit() under --concurrency concurrent submitters
+    (group commit + worker draining to a no-op SMTP session)
+  - compaction time for the delivered rows
+
+Usage (from backend/):
+  python bench/bench_outbox_journal.py --rows 5000 --concurrency 200
+  python bench/bench_outbox_journal.py --dir /var/data   # benchmark a specific disk
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_utils import pct  # noqa: E402
+from outbox import ContactOutbox, OutboxJournal, OutgoingEmail, SMTPSession  # noqa: E402
+
+BODY = "Subject: bench\r\n\r\n" + "hello " * 300  # ~2 KB, about the size of a rendered contact email
+
+
+class NullSession(SMTPSession):
+    def __init__(self):
+        super().__init__("localhost", 0)
+
+    def send(self, email: OutgoingEmail) -> None:
+        pass
+
+
+def make_email() -> OutgoingEmail:
+    return OutgoingEmail(sender="a@example.com", recipient="b@example.com", body=BODY, key=uuid.uuid4().hex,
+                         label="bench")
+
+
+def bench_single(path: Path, rows: int) -> dict:
+    journal = OutboxJournal(path)
+    journal.open()
+    t0 = time.perf_counter()
+    for _ in range(rows):
+        journal.append(make_email())
+    elapsed = time.perf_counter() - t0
+    journal.close()
+    return {"rows": rows, "rows_per_sec": round(rows / elapsed), "us_per_row": round(elapsed / rows * 1e6, 1)}
+
+
+def bench_group(path: Path, rows: int, group: int) -> dict:
+    journal = OutboxJournal(path)
+    journal.open()
+    t0 = time.perf_counter()
+    for _ in range(rows // group):
+        journal.append_many([make_email() for _ in range(group)])
+    elapsed = time.perf_counter() - t0
+    journal.close()
+    done = (rows // group) * group
+    return {"rows": done, "group": group, "rows_per_sec": round(done / elapsed)}
+
+
+async def bench_submit(path: Path, rows: int, concurrency: int) -> dict:
+    outbox = ContactOutbox(NullSession(), OutboxJournal(path), batch_size=200, batch_window=0.05)
+    outbox.start()
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await outbox.submit(make_email())
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(rows)))
+    elapsed = time.perf_counter() - t0
+    while (await outbox.stats())["journal"]["pending"]:
+        await asyncio.sleep(0.05)
+    drained = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    removed = outbox.journal.compact(retention=0)
+    compact_ms = (time.perf_counter() - t1) * 1000
+    await outbox.stop()
+    return {
+        "rows": rows,
+        "concurrency": concurrency,
+        "submits_per_sec": round(rows / elapsed),
+        "submit_p50_ms": round(pct(latencies, 0.5) * 1000, 3),
+        "submit_p99_ms": round(pct(latencies, 0.99) * 1000, 3),
+        "drained_s": round(drained, 3),
+        "compacted_rows": removed,
+        "compact_ms": round(compact_ms, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--group", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--dir", type=Path, help="directory to put the journal in (default: a temp dir)")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    base = args.dir or Path(tempfile.mkdtemp(prefix="bench-outbox-"))
+    result = {
+        "single_commit": bench_single(base / "single.db", args.rows),
+        "group_commit": bench_group(base / "group.db", args.rows, args.group),
+        "submit": asyncio.run(bench_submit(base / "submit.db", args.rows, args.concurrency)),
+    }
+    print(json.dumps(result, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
@@ -0,0 +1,144 @@
+"""
+Offline benchmark: full-context vs retrieval-mode chat prompts.
+
+Builds both prompt variants for a set of sample questions and reports prompt
+size (chars, and tokens counted like the chat prompt budget) and assembly
+latency. With --live (and OPENROUTER_API_KEY set) it also sends each prompt to
+the primary chat model and records end-to-end latency, so the token savings
+can be tied to time.
+
+While the whole corpus fits the token budget, retrieval mode sends the whole
+documents (same as full mode), so at --scale 1 the reduction is ~0; use a larger
+--scale or a smaller --token-budget to measure retrieval itself.
+
+Usage (from backend/):
+  python bench/bench_retrieval.py
+  python bench/bench_retrieval.py --scale 20          # synthetic larger corpus
+  python bench/bench_retrieval.py --token-budget 600
+  python bench/bench_retrieval.py --live --questions 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_store import ContextStore  # noqa: E402
+from retrieval import RetrievalIndex  # noqa: E402
+from token_budget import count_tokens  # noqa: E402
+
+import main  # noqa: E402
+
+QUESTIONS = [
+    "What did Pranav build at Dassault?",
+    "Is he on a visa?",
+    "Tell me about his hackathon wins.",
+    "What programming languages does he use most?",
+    "Where did he go to college and what did he build there?",
+    "What is Project Poltergeist?",
+    "How did he get into AI?",
+    "What are his hobbies outside of work?",
+]
+
+
+def make_store(data_dir: Path, mode: str) -> ContextStore:
+    store = ContextStore(
+        data_dir,
+        main.context_store.profiles,
+        index_factory=(lambda docs: RetrievalIndex(docs, mode=main.RAG_INDEX, chunk_chars=main.RAG_CHUNK_CHARS))
+        if mode == "retrieval" else None,
+    )
+    t0 = time.perf_counter()
+    store.load()
+    store.load_ms = (time.perf_counter() - t0) * 1000
+    return store
+
+
+def scaled_data_dir(scale: int) -> Path:
+    """Copy data/*.txt repeated `scale` times so the corpus resembles a real journey doc."""
+    tmp = Path(tempfile.mkdtemp(prefix="bench-rag-"))
+    for f in main.DATA_DIR.glob("*.txt"):
+        text = f.read_text(encoding="utf-8")
+        (tmp / f.name).write_text("\n\n".join(f"{text}\n\n[section {i}]" for i in range(scale)), encoding="utf-8")
+    return tmp
+
+
+async def live_latency(system: str, question: str) -> float:
+    import httpx
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(timeout=60) as client:
+        resp = await client.post(
+            main.OPENROUTER_BASE,
+            headers={"Authorization": f"Bearer {main.OPENROUTER_API_KEY}"},
+            json={
+                "model": main.CHAT_MODELS[0],
+                "messages": [{"role": "system", "content": system}, {"role": "user", "content": question}],
+                "max_tokens": 300,
+            },
+        )
+        resp.raise_for_status()
+    return (time.perf_counter() - t0) * 1000
+
+
+def retrieval_prompt(store: ContextStore, question: str, github: str, token_budget: int) -> str:
+    """The chat system prompt as the app assembles it: stable prefix + per-question excerpts."""
+    parts = store.split("chat", github, query=question, k=main.RAG_TOP_K, token_budget=token_budget)
+    return "\n\n".join(p for p in parts if p)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="repeat the data files N times")
+    parser.add_argument("--questions", type=int, default=len(QUESTIONS))
+    parser.add_argument("--iterations", type=int, default=200, help="prompt builds per question for timing")
+    parser.add_argument("--token-budget", type=int, default=main.RAG_TOKEN_BUDGET)
+    parser.add_argument("--live", action="store_true", help="also time real OpenRouter calls")
+    parser.add_argument("--out", type=Path, help="write JSON results here")
+    args = parser.parse_args()
+
+    data_dir = scaled_data_dir(args.scale) if args.scale > 1 else main.DATA_DIR
+    github = "GITHUB REPOS (own, non-forked):\n- example: sample repo [Python] ⭐1"
+    questions = QUESTIONS[: args.questions]
+    results: dict = {"scale": args.scale, "token_budget": args.token_budget, "modes": {}}
+
+    for mode in ("full", "retrieval"):
+        store = make_store(data_dir, mode)
+        sizes, tokens, build_us, live_ms = [], [], [], []
+        for q in questions:
+            build = (lambda: retrieval_prompt(store, q, github, args.token_budget)) \
+                if mode == "retrieval" else (lambda: store.build("chat", github))
+            t0 = time.perf_counter()
+            for _ in range(args.iterations):
+                prompt = build()
+            build_us.append((time.perf_counter() - t0) / args.iterations * 1e6)
+            sizes.append(len(prompt))
+            tokens.append(count_tokens(prompt))
+            if args.live and main.OPENROUTER_API_KEY:
+                live_ms.append(asyncio.run(live_latency(prompt, q)))
+        results["modes"][mode] = {
+            "load_ms": round(store.load_ms, 2),
+            "chunks": len(store.index.chunks) if store.index else 0,
+            "prompt_chars_mean": round(statistics.mean(sizes)),
+            "prompt_tokens_mean": round(statistics.mean(tokens)),
+            "build_us_mean": round(statistics.mean(build_us), 1),
+            "live_latency_ms_mean": round(statistics.mean(live_ms), 1) if live_ms else None,
+        }
+
+    full, rag = results["modes"]["full"], results["modes"]["retrieval"]
+    results["token_reduction"] = round(1 - rag["prompt_tokens_mean"] / full["prompt_tokens_mean"], 3)
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    if "--live" in sys.argv and not os.getenv("OPENROUTER_API_KEY"):
+        print("--live needs OPENROUTER_API_KEY; running offline only", file=sys.stderr)
+    main_cli()
@@ -0,0 +1,36 @@
+"""
+Helpers shared by the benchmark scripts: percentiles, event-loop lag sampling
+and the git commit each result is stamped with.
+"""
+
+import asyncio
+import subprocess
+import time
+from pathlib import Path
+
+
+def pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def ms(value: float) -> float:
+    return round(value * 1000, 2)
+
+
+async def loop_lag_sampler(samples: list[float], interval: float = 0.005) -> None:
+    """Append how late each `interval` sleep wakes up — event-loop stalls — until cancelled."""
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - t0 - interval))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
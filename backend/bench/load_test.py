@@ -0,0 +1,259 @@
+"""
+Offline load test: the whole app against local stand-ins for its upstreams.
+
+Boots mock OpenRouter, GitHub and SMTP servers (bench/mock_upstreams.py), then
+serves the real app with uvicorn on localhost — lifespan included — and drives
+each scenario at a fixed concurrency over HTTP:
+
+  health       GET  /api/health
+  haiku        GET  /api/haiku
+  chat         POST /api/chat                   (unique questions → upstream path)
+  chat_stream  POST /api/chat {"stream": true}  (also reports time to first byte)
+  contact      POST /api/contact                (unique submissions)
+
+Per scenario it reports p50/p95/p99/max latency, RPS, status codes and the
+event-loop lag observed while it ran. Mocks, app and load generator share one
+event loop, so loop lag is an upper bound on what the app alone would see.
+Results are JSON, stamped with the git commit, so runs can be compared across
+commits (`--baseline earlier.json` prints the p95/RPS deltas).
+
+Usage (from backend/, needs `pip install -r bench/requirements.txt`):
+  python bench/load_test.py --requests 200 --concurrency 20
+  python bench/load_test.py --scenarios chat,chat_stream --or-latency 2 --or-failure-rate 0.1
+  python bench/load_test.py --out after.json --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+
+from bench_utils import git_commit, loop_lag_sampler, ms, pct  # noqa: E402
+from mock_upstreams import (  # noqa: E402
+    OpenRouterBehaviour,
+    SMTPSink,
+    make_github_app,
+    make_openrouter_app,
+    serve,
+    shutdown,
+    start_smtp,
+)
+
+SCENARIOS = ("health", "haiku", "chat", "chat_stream", "contact")
+
+
+def configure_env(args) -> None:
+    """Point the app at the stand-ins. Must run before `import main`."""
+    os.environ.update({
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE": f"http://127.0.0.1:{args.or_port}/api/v1/chat/completions",
+        "GITHUB_API_BASE": f"http://127.0.0.1:{args.gh_port}",
+        "GITHUB_PAT": "",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(args.smtp_port),
+        "SMTP_USER": "bench@example.com",
+        "SMTP_PASS": "bench",
+        "STATE_DIR": tempfile.mkdtemp(prefix="bench-state-"),
+        "HAIKU_CACHE_URL": "memory://",
+        "CHAT_CACHE_ENABLED": "true" if args.chat_cache else "false",
+    })
+    if not args.rate_limits:
+        # Every request comes from one IP here; per-client buckets would just measure the limiter
+        os.environ.update({"CHAT_RATE_PER_MIN": "1e9", "CHAT_RATE_BURST": "1e9"})
+
+
+def request_for(scenario: str, i: int) -> tuple[str, str, dict | None]:
+    if scenario == "health":
+        return "GET", "/api/health", None
+    if scenario == "haiku":
+        return "GET", "/api/haiku", None
+    if scenario in ("chat", "chat_stream"):
+        body = {"message": f"What did Pranav work on before AI? (#{i})", "history": []}
+        if scenario == "chat_stream":
+            body["stream"] = True
+        return "POST", "/api/chat", body
+    return "POST", "/api/contact", {
+        "name": f"Bench {i}", "email": f"bench{i}@example.com",
+        "subject": "Load test", "message": f"hello #{i} " * 20,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    ttfb: list[float] = []
+    statuses: Counter = Counter()
+    lag: list[float] = []
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            method, path, body = request_for(scenario, i)
+            t0 = time.perf_counter()
+            try:
+                async with client.stream(method, path, json=body) as resp:
+                    first = True
+                    async for _ in resp.aiter_raw():
+                        if first:
+                            ttfb.append(time.perf_counter() - t0)
+                            first = False
+                statuses[str(resp.status_code)] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - t0)
+
+    sampler = asyncio.create_task(loop_lag_sampler(lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.05)  # let the sampler record any stall that just ended
+    sampler.cancel()
+
+    ok = sum(n for code, n in statuses.items() if code.startswith("2"))
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": dict(statuses),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(pct(latencies, 0.5)),
+            "p95": ms(pct(latencies, 0.95)),
+            "p99": ms(pct(latencies, 0.99)),
+            "max": ms(max(latencies, default=0.0)),
+            "mean": ms(statistics.fmean(latencies)) if latencies else 0.0,
+        },
+        "loop_lag_ms": {
+            "p99": ms(pct(lag, 0.99)),
+            "max": ms(max(lag, default=0.0)),
+            "mean": round(statistics.fmean(lag) * 1000, 3) if lag else 0.0,
+        },
+    }
+    if scenario == "chat_stream":
+        result["ttfb_ms"] = {"p50": ms(pct(ttfb, 0.5)), "p95": ms(pct(ttfb, 0.95)), "p99": ms(pct(ttfb, 0.99))}
+    return result
+
+
+async def run(args) -> dict:
+    configure_env(args)
+    import main  # noqa: E402 — reads the environment at import time
+    if not args.verbose:
+        logging.disable(logging.WARNING)  # injected 503s would otherwise flood the output
+
+    behaviour = OpenRouterBehaviour(
+        latency=args.or_latency, jitter=args.or_jitter, failure_rate=args.or_failure_rate,
+        ttft=args.or_ttft, stream_chunks=args.or_chunks,
+    )
+    github_counts: dict = {}
+    sink = SMTPSink(args.smtp_delay)
+    smtp = start_smtp(sink, args.smtp_port)
+    # The stand-in speaks neither STARTTLS nor AUTH; keep the configured sender, skip both
+    main.contact_outbox.session = main.SMTPSession("127.0.0.1", args.smtp_port, starttls=False)
+
+    servers = [
+        await serve(make_openrouter_app(behaviour), args.or_port),
+        await serve(make_github_app(args.gh_latency, github_counts), args.gh_port),
+        await serve(main.app, args.app_port, lifespan="on"),
+    ]
+    results: dict = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.app_port}", limits=limits, timeout=120.0
+        ) as client:
+            for scenario in args.scenarios:
+                print(f"→ {scenario}: {args.requests} requests @ {args.concurrency}", file=sys.stderr)
+                results[scenario] = await run_scenario(client, scenario, args.requests, args.concurrency)
+    finally:
+        for server, task in reversed(servers):
+            await shutdown(server, task)
+        smtp.stop()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "chat_cache": args.chat_cache,
+            "rate_limits": args.rate_limits,
+            "openrouter": {"latency_s": args.or_latency, "jitter": args.or_jitter,
+                           "failure_rate": args.or_failure_rate, "ttft_s": args.or_ttft},
+            "github_latency_s": args.gh_latency,
+            "smtp_delay_s": args.smtp_delay,
+        },
+        "scenarios": results,
+        "upstreams": {
+            "openrouter": behaviour.counts,
+            "github": github_counts,
+            "smtp": {"received": sink.received, "sessions": len(sink.sessions)},
+        },
+    }
+
+
+def compare(result: dict, baseline: dict) -> list[str]:
+    lines = [f"vs. baseline {baseline.get('commit', '?')}:"]
+    for name, now in result["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        p95_now, p95_before = now["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        rps_now, rps_before = now["rps"], before["rps"]
+        dp95 = (p95_now - p95_before) / p95_before * 100 if p95_before else 0.0
+        drps = (rps_now - rps_before) / rps_before * 100 if rps_before else 0.0
+        lines.append(
+            f"  {name:12} p95 {p95_before:>9.1f} → {p95_now:>9.1f} ms ({dp95:+.1f}%)"
+            f"   rps {rps_before:>7.1f} → {rps_now:>7.1f} ({drps:+.1f}%)"
+        )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=lambda s: [x for x in s.split(",") if x], default=list(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chat-cache", action="store_true", help="leave the chat response cache on")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-client rate limits on")
+    parser.add_argument("--or-latency", type=float, default=1.0, help="mock OpenRouter response time (s)")
+    parser.add_argument("--or-jitter", type=float, default=0.2, help="± fraction of --or-latency")
+    parser.add_argument("--or-failure-rate", type=float, default=0.0, help="fraction of 503s")
+    parser.add_argument("--or-ttft", type=float, default=0.3, help="mock time to first streamed token (s)")
+    parser.add_argument("--or-chunks", type=int, default=20, help="SSE deltas per streamed reply")
+    parser.add_argument("--gh-latency", type=float, default=0.05)
+    parser.add_argument("--smtp-delay", type=float, default=0.05)
+    parser.add_argument("--app-port", type=int, default=8790)
+    parser.add_argument("--or-port", type=int, default=8791)
+    parser.add_argument("--gh-port", type=int, default=8792)
+    parser.add_argument("--smtp-port", type=int, default=8793)
+    parser.add_argument("--verbose", action="store_true", help="keep the app's info/warning logs")
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--baseline", type=Path, help="earlier --out file to compare against")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
+    if args.baseline:
+        print("\n".join(compare(result, json.loads(args.baseline.read_text()))), file=sys.stderr)
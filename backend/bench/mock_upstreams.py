@@ -0,0 +1,224 @@
+"""
+Local stand-ins for the app's upstreams, for offline benchmarks.
+
+  OpenRouter  POST /api/v1/chat/completions — configurable latency (+ jitter),
+              failure rate (503) and streaming (SSE deltas spread over the
+              response time, first token after `ttft`); JSON-mode requests get
+              a {"haikus": [...]} object of fresh (never repeated) 5-7-5
+              haikus; every response carries a usage object
+  GitHub      GET /users/{user}/repos and /users/{user}/events/public with a
+              strong ETag — If-None-Match answers 304
+  SMTP        aiosmtpd sink with a per-message delay (needs bench/requirements.txt)
+
+Each HTTP mock is a plain ASGI app served by uvicorn on 127.0.0.1 inside the
+caller's event loop (see `serve()`), so the app under test does real socket I/O
+through its pooled clients. Run as a script, it serves the OpenRouter and
+GitHub mocks in their own process (used by bench/worker_scaling.py):
+
+  python bench/mock_upstreams.py --or-port 8791 --gh-port 8792 --or-latency 0.05
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+from dataclasses import dataclass, field
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+@dataclass
+class OpenRouterBehaviour:
+    latency: float = 1.0          # seconds for a full (non-streamed) response
+    jitter: float = 0.2           # ± fraction of latency
+    failure_rate: float = 0.0     # fraction of requests answered with 503
+    ttft: float = 0.3             # seconds to first streamed token
+    stream_chunks: int = 20
+    counts: dict = field(default_factory=lambda: {"requests": 0, "failures": 0, "streams": 0, "streams_closed_early": 0})
+    haiku_serial: itertools.count = field(default_factory=itertools.count)
+
+    def duration(self) -> float:
+        return max(0.0, self.latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+_DIGIT_WORDS = ("one", "two", "three", "four", "five")  # one syllable each
+
+
+def _words(i: int, digits: int) -> str:
+    return " ".join(_DIGIT_WORDS[(i // 5 ** d) % 5] for d in range(digits))
+
+
+def mock_haikus(serial: itertools.count, n: int = 6) -> list[dict]:
+    # Unique lines and facts per call, so the app's dedupe index doesn't stop the pool
+    # filling; counting words in base 5 keeps every haiku 5-7-5
+    return [
+        {"id": f"mock{i}",
+         "lines": ["Mock haiku number", f"{_words(i, 4)} more words here", f"{_words(i // 625, 3)} mock end"],
+         "fact": f"Mock fact number {i}.", "emoji": "🎋"}
+        for i in (next(serial) for _ in range(n))
+    ]
+
+MOCK_REPLY = (
+    "Pranav spent his early career building simulation tooling before moving into applied AI, "
+    "where he now ships multi-agent systems end to end. It's a journey with a lot of late nights "
+    "and a surprising number of airplanes."
+)
+
+
+def make_openrouter_app(behaviour: OpenRouterBehaviour) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        behaviour.counts["requests"] += 1
+        if random.random() < behaviour.failure_rate:
+            behaviour.counts["failures"] += 1
+            await asyncio.sleep(behaviour.duration() * 0.1)
+            return JSONResponse({"error": {"message": "mock overload"}}, status_code=503)
+
+        if body.get("response_format"):
+            content = json.dumps({"haikus": mock_haikus(behaviour.haiku_serial)}, ensure_ascii=False)
+        else:
+            content = MOCK_REPLY
+        usage = {
+            "prompt_tokens": sum(len(json.dumps(m.get("content", ""))) for m in body["messages"]) // 4,
+            "completion_tokens": len(content) // 4,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(behaviour.duration())
+            return {"choices": [{"message": {"role": "assistant", "content": content}}], "usage": usage}
+
+        behaviour.counts["streams"] += 1
+        total = behaviour.duration()
+        n = max(1, behaviour.stream_chunks)
+        step = max(0.0, total - behaviour.ttft) / n
+        size = -(-len(content) // n)
+
+        async def events():
+            finished = False
+            try:
+                await asyncio.sleep(behaviour.ttft)
+                for i in range(0, len(content), size):
+                    chunk = {"choices": [{"delta": {"content": content[i:i + size]}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(step)
+                yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+                finished = True
+            finally:
+                if not finished:
+                    behaviour.counts["streams_closed_early"] += 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def make_github_app(latency: float = 0.05, counts: dict | None = None) -> FastAPI:
+    app = FastAPI()
+    counts = counts if counts is not None else {}
+    counts.update({"requests": 0, "not_modified": 0})
+
+    repos = [
+        {"name": f"project-{i}", "description": f"Mock repository {i}", "language": "Python",
+         "stargazers_count": i, "fork": i % 5 == 0}
+        for i in range(30)
+    ]
+    events = [
+        {"type": "PushEvent", "repo": {"name": f"p-kowadkar/project-{i}"},
+         "payload": {"commits": [{"author": {"name": "Pranav Kowadkar"}, "message": f"Mock commit {i}"}]}}
+        for i in range(30)
+    ]
+
+    def conditional(request: Request, payload: list) -> Response:
+        counts["requests"] += 1
+        raw = json.dumps(payload)
+        etag = '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            counts["not_modified"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(raw, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/users/{user}/repos")
+    async def user_repos(user: str, request: Request):
+        await asyncio.sleep(latency)
+        return conditional(request, repos)
+
+    @app.get("/users/{user}/events/public")
+    async def user_events(user: str, request: Request):
+        await asyncio.sleep(latency)
+        return conditional(request, events)
+
+    return app
+
+
+class SMTPSink:
+    """aiosmtpd handler that accepts every message after a fixed delay."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.received = 0
+        self.sessions: set[int] = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.sessions.add(id(session))
+        return "250 OK"
+
+
+def start_smtp(sink: SMTPSink, port: int):
+    from aiosmtpd.controller import Controller  # bench-only dependency
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller
+
+
+async def serve(app, port: int, lifespan: str = "off") -> tuple[uvicorn.Server, asyncio.Task]:
+    """Run `app` on 127.0.0.1:`port` in the current loop; returns once it accepts connections."""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan=lifespan)
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()  # surface bind errors
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def shutdown(server: uvicorn.Server, task: asyncio.Task) -> None:
+    server.should_exit = True
+    await task
+
+
+async def _main(args) -> None:
+    behaviour = OpenRouterBehaviour(latency=args.or_latency, jitter=args.or_jitter, ttft=args.or_ttft)
+    servers = [
+        await serve(make_openrouter_app(behaviour), args.or_port),
+        await serve(make_github_app(args.gh_latency), args.gh_port),
+    ]
+    print("ready", flush=True)
+    try:
+        await asyncio.gather(*(task for _, task in servers))
+    finally:
+        for server, task in servers:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the OpenRouter and GitHub mocks until interrupted.")
+    parser.add_argument("--or-port", type=int, default=8791)
+    parser.add_argument("--gh-port", type=int, default=8792)
+    parser.add_argument("--or-latency", type=float, default=1.0)
+    parser.add_argument("--or-jitter", type=float, default=0.2)
+    parser.add_argument("--or-ttft", type=float, default=0.3)
+    parser.add_argument("--gh-latency", type=float, default=0.05)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,155 @@
+"""
+Cold-start measurement: time from process start to the first successful chat.
+
+Starts the mock OpenRouter and GitHub servers (bench/mock_upstreams.py) in this
+process, then launches the app as a fresh `uvicorn main:app` subprocess, so
+interpreter start-up and imports are part of the measurement. From the moment
+the process is spawned it polls, every few milliseconds:
+
+  live         first 200 from GET /api/health
+  ready        first 200 from GET /api/health/ready (startup warm-up done)
+  first_chat   first 200 from POST /api/chat — attempted as soon as the port
+               accepts connections, like a visitor arriving right after a wake
+  first_haiku  first 200 from GET /api/haiku
+
+Each run uses a fresh state directory (cold caches). Results are JSON, stamped
+with the git commit; `--no-warmup` sets WARMUP_ENABLED=false for comparison.
+
+Usage (from backend/):
+  python bench/time_to_first_chat.py --runs 5
+  python bench/time_to_first_chat.py --runs 5 --no-warmup --or-latency 1.5 --gh-latency 0.4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+
+from bench_utils import git_commit  # noqa: E402
+from mock_upstreams import OpenRouterBehaviour, make_github_app, make_openrouter_app, serve, shutdown  # noqa: E402
+
+MILESTONES = ("live", "ready", "first_chat", "first_haiku")
+
+
+def app_env(args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE": f"http://127.0.0.1:{args.or_port}/api/v1/chat/completions",
+        "GITHUB_API_BASE": f"http://127.0.0.1:{args.gh_port}",
+        "GITHUB_PAT": "",
+        "STATE_DIR": tempfile.mkdtemp(prefix="ttfc-state-"),
+        "CHAT_CACHE_ENABLED": "false",
+        "WARMUP_ENABLED": "false" if args.no_warmup else "true",
+    })
+    return env
+
+
+async def poll(client: httpx.AsyncClient, method: str, path: str, body: dict | None,
+               started: float, deadline: float, interval: float) -> float | None:
+    """Seconds from `started` until `path` first answers 200, or None at the deadline."""
+    while time.perf_counter() < deadline:
+        try:
+            resp = await client.request(method, path, json=body)
+            if resp.status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass  # not listening yet
+        await asyncio.sleep(interval)
+    return None
+
+
+async def one_run(args) -> dict:
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.app_port)]
+    output = None if args.verbose else subprocess.DEVNULL
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=BACKEND, env=app_env(args), stdout=output, stderr=output)
+    deadline = started + args.timeout
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", timeout=60.0) as client:
+            chat = {"message": "What did Pranav work on before AI?", "history": []}
+            results = await asyncio.gather(
+                poll(client, "GET", "/api/health", None, started, deadline, args.interval),
+                poll(client, "GET", "/api/health/ready", None, started, deadline, args.interval),
+                poll(client, "POST", "/api/chat", chat, started, deadline, args.interval),
+                poll(client, "GET", "/api/haiku", None, started, deadline, args.interval),
+            )
+            diagnostics = (await client.get("/api/diagnostics")).json() if results[0] is not None else {}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    run = {name: round(value, 3) if value is not None else None for name, value in zip(MILESTONES, results)}
+    run["app_startup"] = diagnostics.get("startup")
+    return run
+
+
+def summarize(runs: list[dict]) -> dict:
+    summary = {}
+    for name in MILESTONES:
+        values = [r[name] for r in runs if r[name] is not None]
+        summary[name] = {
+            "median_s": round(statistics.median(values), 3) if values else None,
+            "min_s": min(values, default=None),
+            "max_s": max(values, default=None),
+            "failed_runs": len(runs) - len(values),
+        }
+    return summary
+
+
+async def run(args) -> dict:
+    behaviour = OpenRouterBehaviour(latency=args.or_latency, jitter=0.0, ttft=min(args.or_latency, 0.3))
+    servers = [
+        await serve(make_openrouter_app(behaviour), args.or_port),
+        await serve(make_github_app(args.gh_latency), args.gh_port),
+    ]
+    runs = []
+    try:
+        for i in range(args.runs):
+            runs.append(await one_run(args))
+            print(f"run {i + 1}/{args.runs}: " + ", ".join(f"{m}={runs[-1][m]}" for m in MILESTONES), file=sys.stderr)
+    finally:
+        for server, task in reversed(servers):
+            await shutdown(server, task)
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {"runs": args.runs, "warmup": not args.no_warmup,
+                   "or_latency_s": args.or_latency, "gh_latency_s": args.gh_latency},
+        "summary": summarize(runs),
+        "runs": runs,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-warmup", action="store_true", help="start the app with WARMUP_ENABLED=false")
+    parser.add_argument("--or-latency", type=float, default=1.0, help="mock OpenRouter response time (s)")
+    parser.add_argument("--gh-latency", type=float, default=0.2, help="mock GitHub response time (s)")
+    parser.add_argument("--interval", type=float, default=0.01, help="poll interval (s)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="give up on a milestone after this (s)")
+    parser.add_argument("--app-port", type=int, default=8795)
+    parser.add_argument("--or-port", type=int, default=8796)
+    parser.add_argument("--gh-port", type=int, default=8797)
+    parser.add_argument("--verbose", action="store_true", help="show the app's logs")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
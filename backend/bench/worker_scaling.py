@@ -0,0 +1,161 @@
+"""
+Throughput vs. number of workers for the multi-worker profile (gunicorn.conf.py).
+
+Starts the OpenRouter/GitHub mocks in their own process, then for each worker
+count launches `gunicorn -c gunicorn.conf.py main:app` with WEB_CONCURRENCY=N
+(so SHARED_STATE_URL points every worker at one SQLite file, as in production)
+and drives the scenarios from load_test.py against it over HTTP. The load
+generator is a single asyncio process; on small machines it competes with the
+workers for CPU, so compare runs on the same host only.
+
+Reports RPS, p95 and speedup relative to the smallest worker count, plus the
+CPU count — workers beyond it can't add throughput for CPU-bound routes.
+
+Usage (from backend/, needs gunicorn):
+  python bench/worker_scaling.py --workers 1,2,4 --scenarios health,chat --requests 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import httpx  # noqa: E402
+
+from bench_utils import git_commit  # noqa: E402
+from load_test import run_scenario  # noqa: E402
+
+SCENARIOS = ("health", "haiku", "chat", "chat_stream")
+
+
+def app_env(args, workers: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(args.app_port),
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE": f"http://127.0.0.1:{args.or_port}/api/v1/chat/completions",
+        "GITHUB_API_BASE": f"http://127.0.0.1:{args.gh_port}",
+        "GITHUB_PAT": "",
+        "STATE_DIR": tempfile.mkdtemp(prefix="scaling-state-"),
+        "CHAT_CACHE_ENABLED": "false",
+        # One client IP and a deliberately saturating load: measure the workers, not the limiters
+        "CHAT_RATE_PER_MIN": "1e9",
+        "CHAT_RATE_BURST": "1e9",
+        "LLM_MAX_IN_FLIGHT": "10000",
+    })
+    env.pop("SHARED_STATE_URL", None)
+    return env
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/health/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError("app did not become ready")
+
+
+async def measure(args, workers: int) -> dict:
+    output = None if args.verbose else subprocess.DEVNULL
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=BACKEND, env=app_env(args, workers), stdout=output, stderr=output,
+    )
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.app_port}", limits=limits, timeout=120.0
+        ) as client:
+            await wait_ready(client)
+            await asyncio.sleep(args.settle)  # readiness came from one worker; give the rest time
+            for scenario in args.scenarios:
+                print(f"→ {workers} worker(s) · {scenario}: {args.requests} @ {args.concurrency}", file=sys.stderr)
+                results[scenario] = await run_scenario(client, scenario, args.requests, args.concurrency)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=45)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return results
+
+
+async def run(args) -> dict:
+    mocks = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("mock_upstreams.py")),
+         "--or-port", str(args.or_port), "--gh-port", str(args.gh_port),
+         "--or-latency", str(args.or_latency), "--or-ttft", str(min(args.or_latency, 0.3)),
+         "--gh-latency", "0.01"],
+        stdout=subprocess.PIPE, stderr=None if args.verbose else subprocess.DEVNULL, text=True,
+    )
+    try:
+        if mocks.stdout.readline().strip() != "ready":
+            raise RuntimeError("mock upstreams failed to start")
+        by_workers = {}
+        for workers in args.workers:
+            by_workers[str(workers)] = await measure(args, workers)
+    finally:
+        mocks.terminate()
+        mocks.wait(timeout=15)
+
+    base = by_workers[str(args.workers[0])]
+    scaling = {
+        scenario: {
+            workers: {
+                "rps": res[scenario]["rps"],
+                "p95_ms": res[scenario]["latency_ms"]["p95"],
+                "errors": res[scenario]["errors"],
+                "speedup": round(res[scenario]["rps"] / base[scenario]["rps"], 2) if base[scenario]["rps"] else None,
+            }
+            for workers, res in by_workers.items()
+        }
+        for scenario in args.scenarios
+    }
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "cpus": os.cpu_count(),
+        "config": {"workers": args.workers, "requests": args.requests, "concurrency": args.concurrency,
+                   "or_latency_s": args.or_latency},
+        "scaling": scaling,
+        "runs": by_workers,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=lambda s: [int(x) for x in s.split(",") if x], default=[1, 2, 4])
+    parser.add_argument("--scenarios", type=lambda s: [x for x in s.split(",") if x], default=["health", "chat"],
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and worker count")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--or-latency", type=float, default=0.05, help="mock OpenRouter response time (s)")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait after the first ready probe")
+    parser.add_argument("--app-port", type=int, default=8798)
+    parser.add_argument("--or-port", type=int, default=8791)
+    parser.add_argument("--gh-port", type=int, default=8792)
+    parser.add_argument("--verbose", action="store_true", help="show gunicorn and mock logs")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    print(json.dumps({k: v for k, v in result.items() if k != "runs"}, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
@@ -0,0 +1,273 @@
+"""
+Pluggable key/value cache backends with a Redis-compatible surface.
+
+Every backend implements the subset of redis-py's (decode_responses=True)
+client that the app uses — `get`, `set(..., ex=, nx=)`, `delete` — so a real
+Redis, or anything speaking the same interface, can be dropped in. Locks taken
+with `set(..., nx=True)` are released with `delete_if(backend, key, owner)`,
+which only deletes the key while it still holds the owner's value, and
+documents several processes modify are changed with `update(backend, key, fn)`,
+an atomic read-modify-write:
+
+  memory://                   per-process dict (no sharing, lost on restart)
+  file:///path/to/dir         one file per key, written via atomic rename
+  sqlite:///path/to/cache.db  SQLite (WAL) — shared by every worker on the host
+  redis://host:6379/0         Redis (needs the optional `redis` package)
+
+Values are strings (callers store JSON) and `ex` is whole seconds — redis-py
+rejects a float, so callers round TTLs up with math.ceil(). Calls are blocking
+but local backends take microseconds; wrap them in asyncio.to_thread() when the
+backend is remote or shared between processes (lock waits), or hand writes that
+nobody awaits to `run_in_background()`.
+
+SQLiteBackend also offers `transaction(fn)` for read-modify-write updates that
+must be atomic across processes (used by the shared rate limiter).
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._data: dict[str, tuple[str, float | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and self.get(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ex if ex else None)
+            return True
+
+    def delete(self, key: str) -> int:
+        return 1 if self._data.pop(key, None) is not None else 0
+
+    def delete_if(self, key: str, value: str) -> int:
+        with self._lock:
+            if self.get(key) != value:
+                return 0
+            return self.delete(key)
+
+    def update(self, key: str, fn, ex: float | None = None) -> str:
+        with self._lock:
+            value = fn(self.get(key))
+            self._data[key] = (value, time.time() + ex if ex else None)
+            return value
+
+
+class FileBackend:
+    """One JSON file per key: {"value", "expires_at"}. Writes go to a temp file + os.replace()."""
+
+    def __init__(self, directory: Path | str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+    def _read(self, path: Path) -> tuple[str, float | None] | None:
+        try:
+            item = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        return item["value"], item.get("expires_at")
+
+    def get(self, key: str) -> str | None:
+        item = self._read(self._path(key))
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        path = self._path(key)
+        payload = json.dumps({"value": value, "expires_at": time.time() + ex if ex else None})
+        if nx:
+            # O_EXCL create is the atomic "only if absent" primitive on a filesystem
+            if self.get(key) is not None:
+                return False
+            path.unlink(missing_ok=True)  # expired leftover
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                return False
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            return True
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return True
+
+    def delete(self, key: str) -> int:
+        try:
+            self._path(key).unlink()
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def delete_if(self, key: str, value: str) -> int:
+        # Not atomic across processes (no compare-and-swap on a plain file) — use sqlite:// for that
+        if self.get(key) != value:
+            return 0
+        return self.delete(key)
+
+    def update(self, key: str, fn, ex: float | None = None) -> str:
+        # Not atomic across processes either; last writer wins
+        value = fn(self.get(key))
+        self.set(key, value, ex=ex)
+        return value
+
+
+class SQLiteBackend:
+    def __init__(self, path: Path | str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ex: float | None = None, nx: bool = False) -> bool:
+        now = time.time()
+        expires_at = now + ex if ex else None
+        with self._lock:
+            if nx:
+                # Take over only an absent or expired key — atomic across processes
+                cur = self._db.execute(
+                    "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                    "WHERE kv.expires_at IS NOT NULL AND kv.expires_at <= ?",
+                    (key, value, expires_at, now),
+                )
+                return cur.rowcount == 1
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+        return True
+
+    def delete(self, key: str) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM kv WHERE key = ?", (key,)).rowcount
+
+    def delete_if(self, key: str, value: str) -> int:
+        return self.transaction(lambda db: db.execute(
+            "DELETE FROM kv WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, value, time.time()),
+        ).rowcount)
+
+    def update(self, key: str, fn, ex: float | None = None) -> str:
+        def txn(db) -> str:
+            now = time.time()
+            row = db.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+            ).fetchone()
+            value = fn(row[0] if row else None)
+            db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ex if ex else None),
+            )
+            return value
+
+        return self.transaction(txn)
+
+    def transaction(self, fn):
+        """Run fn(connection) under BEGIN IMMEDIATE: no other process can write until it returns."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+
+# Redis has no compare-and-delete command; this is the standard lock-release script
+_DELETE_IF_LUA = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+def delete_if(backend, key: str, value: str) -> int:
+    """Delete `key` only if it still holds `value` (e.g. release a lock we own, not a successor's)."""
+    if hasattr(backend, "delete_if"):
+        return backend.delete_if(key, value)
+    return backend.eval(_DELETE_IF_LUA, 1, key, value)   # redis-py
+
+
+def update(backend, key: str, fn, ex: float | None = None) -> str:
+    """
+    Atomic read-modify-write: store fn(current value or None) under `key` and return it.
+    Other writers are excluded for the duration (SQLite lock / Redis WATCH, retried on conflict).
+    """
+    if hasattr(backend, "update"):
+        return backend.update(key, fn, ex=ex)
+
+    def txn(pipe) -> str:   # redis-py
+        value = fn(pipe.get(key))
+        pipe.multi()
+        pipe.set(key, value, ex=ex)
+        return value
+
+    return backend.transaction(txn, key, value_from_callable=True)
+
+
+def run_in_background(fn, *args, **kwargs) -> None:
+    """
+    Fire-and-forget a blocking backend call on the default executor, so the event loop
+    never waits on it (inline when no loop is running). `fn` must handle its own errors.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        fn(*args, **kwargs)
+        return
+    loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+
+def make_cache_backend(url: str):
+    """Build a backend from a URL (see module docstring)."""
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryBackend()
+    if parsed.scheme == "file":
+        return FileBackend(parsed.netloc + parsed.path)
+    if parsed.scheme == "sqlite":
+        return SQLiteBackend(parsed.netloc + parsed.path)
+    if parsed.scheme in ("redis", "rediss"):
+        import redis  # optional dependency
+        return redis.Redis.from_url(url, decode_responses=True)
+    raise ValueError(f"Unsupported cache backend URL: {url!r}")
@@ -0,0 +1,242 @@
+"""
+Per-model circuit breakers for the OpenRouter fallback chains.
+
+  closed    → calls flow; `failure_threshold` consecutive upstream failures open it
+              (a 429 opens it immediately)
+  open      → model is skipped without a request until its cooldown elapses
+  half_open → exactly one probe call is let through; success closes the breaker,
+              failure re-opens it with the cooldown doubled (capped at max_cooldown)
+
+Only failures that say something about the model's availability count: 429,
+5xx, timeouts and transport errors. A 400 (e.g. a bad payload) doesn't trip it.
+
+With a `shared` cache backend, the registry publishes every open/close to it and
+adopts newer transitions made by other worker processes (checked at most every
+`sync_interval` seconds), so one worker's 429 keeps the others off that model too.
+Reads and writes of the shared state run on executor threads, never on the loop.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+
+import httpx
+
+from cache_backends import run_in_background
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def is_breaker_failure(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError, TimeoutError))
+
+
+def retry_after(exc: BaseException) -> float | None:
+    if isinstance(exc, httpx.HTTPStatusError):
+        try:
+            return float(exc.response.headers.get("retry-after", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, base_cooldown: float = 30.0, max_cooldown: float = 600.0):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0            # consecutive openings → exponential cooldown
+        self.cooldown = 0.0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.changed_at = 0.0     # wall clock of the last open/close, to order transitions across processes
+        self.on_change = None     # called with the breaker after it opens or closes
+
+    @property
+    def reopens_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic()) if self.state == OPEN else 0.0
+
+    def available(self) -> bool:
+        """Non-claiming check: would allow() let a call through right now?"""
+        if self.state == OPEN:
+            return self.reopens_in == 0.0
+        return self.state == CLOSED or not self._probe_in_flight
+
+    def allow(self) -> bool:
+        """Whether a call may go through now. Claims the probe slot when moving to half-open."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.reopens_in == 0.0:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        was_closed = self.state == CLOSED and not self.trips
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._probe_in_flight = False
+        if not was_closed:
+            self._changed()
+
+    def record_failure(self, exc: BaseException) -> None:
+        if not is_breaker_failure(exc):
+            # Not an availability problem: no verdict either way — free the probe slot if this
+            # was one, and stay half-open so the next call probes again
+            self.release()
+            return
+        self.consecutive_failures += 1
+        rate_limited = isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429
+        if self.state == HALF_OPEN or rate_limited or self.consecutive_failures >= self.failure_threshold:
+            self._open(retry_after(exc))
+
+    def probe_early(self) -> None:
+        """Move an open breaker to half-open ahead of its cooldown (used when every model is open)."""
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+
+    def release(self) -> None:
+        """The call was cancelled (e.g. lost a hedge race) — no verdict, give back the probe slot."""
+        if self.state == HALF_OPEN and self._probe_in_flight:
+            self._probe_in_flight = False
+
+    def _open(self, hint: float | None = None) -> None:
+        self.trips += 1
+        self.cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (self.trips - 1))
+        if hint:
+            self.cooldown = max(self.cooldown, min(hint, self.max_cooldown))
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self._changed()
+
+    def _changed(self) -> None:
+        self.changed_at = time.time()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    # ── cross-process state ──────────────────────────────────────────────────
+    def dumps(self) -> str:
+        return json.dumps({
+            "state": CLOSED if self.state == CLOSED else OPEN,
+            "trips": self.trips,
+            "cooldown": self.cooldown,
+            "open_until": time.time() + self.reopens_in if self.state == OPEN else 0.0,
+            "changed_at": self.changed_at,
+        })
+
+    def adopt(self, raw: str) -> bool:
+        """Take over a transition published by another process if it is newer than ours."""
+        remote = json.loads(raw)
+        if remote["changed_at"] <= self.changed_at:
+            return False
+        self.changed_at = remote["changed_at"]
+        self.trips = remote["trips"]
+        self.cooldown = remote["cooldown"]
+        self._probe_in_flight = False
+        if remote["state"] == OPEN:
+            remaining = max(0.0, remote["open_until"] - time.time())
+            self.state = OPEN
+            self.opened_at = time.monotonic() - (self.cooldown - remaining)
+        else:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+        return True
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "cooldown_s": round(self.cooldown, 1),
+            "reopens_in_s": round(self.reopens_in, 1),
+        }
+
+
+class BreakerRegistry:
+    def __init__(self, failure_threshold: int = 3, base_cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 shared=None, sync_interval: float = 1.0):
+        self._kwargs = dict(failure_threshold=failure_threshold, base_cooldown=base_cooldown, max_cooldown=max_cooldown)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._synced_at = 0.0
+        self.counters = {"published": 0, "adopted": 0, "sync_errors": 0}
+
+    def __getitem__(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(**self._kwargs)
+            if self.shared is not None:
+                breaker.on_change = lambda b, m=model: self._publish(m, b)
+        return breaker
+
+    @staticmethod
+    def _key(model: str) -> str:
+        return f"breaker:{model}"
+
+    def _publish(self, model: str, breaker: CircuitBreaker) -> None:
+        # Snapshot now, write off the loop
+        run_in_background(self._write, model, breaker.dumps())
+
+    def _write(self, model: str, state: str) -> None:
+        try:
+            self.shared.set(self._key(model), state, ex=math.ceil(self._kwargs["max_cooldown"] * 4))
+            self.counters["published"] += 1
+        except Exception as e:
+            self.counters["sync_errors"] += 1
+            logger.warning(f"Publishing breaker state for {model} failed: {e}")
+
+    def _read(self, models: list[str]) -> dict[str, str]:
+        states = {}
+        for model in models:
+            try:
+                raw = self.shared.get(self._key(model))
+            except Exception as e:
+                self.counters["sync_errors"] += 1
+                logger.warning(f"Reading shared breaker state for {model} failed: {e}")
+                continue
+            if raw:
+                states[model] = raw
+        return states
+
+    async def sync(self, models: list[str]) -> None:
+        """Adopt newer transitions other processes published for `models` (rate-limited)."""
+        now = time.monotonic()
+        if self.shared is None or now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        for model, raw in (await asyncio.to_thread(self._read, models)).items():
+            if self[model].adopt(raw):
+                self.counters["adopted"] += 1
+
+    def admit(self, models: list[str]) -> list[str]:
+        """Models whose breaker would currently let a call through, in the given order.
+
+        If every breaker is open, the one that reopens soonest is probed early
+        rather than failing the request outright.
+        """
+        admitted = [m for m in models if self[m].available()]
+        if admitted or not models:
+            return admitted
+        soonest = min(models, key=lambda m: self[m].reopens_in)
+        self[soonest].probe_early()
+        return [soonest]
+
+    def snapshot(self) -> dict:
+        return {model: b.snapshot() for model, b in self._breakers.items()}
+
+    def stats(self) -> dict:
+        return {**self.counters, "shared": self.shared is not None}
@@ -0,0 +1,177 @@
+"""
+Memory-resident RAG context for chat and haiku prompts.
+
+The data files are read once at startup and pre-assembled into one immutable
+document block per endpoint profile (each profile has its own truncation
+limits). A background watcher polls file mtimes off the request path and
+rebuilds only when a file actually changed, so handlers do no file I/O and —
+for a given GitHub snapshot — no string building either.
+
+When an `index_factory` is given, a retrieval index over the full documents is
+rebuilt alongside the blocks, and `split(..., query=)` assembles a prompt from only
+the chunks relevant to a question instead of the whole documents — unless the whole
+corpus already fits the retrieval budget, in which case the documents are sent
+as-is (more context, and a stable prefix big enough to be cached).
+
+`split()` returns a prompt as (stable prefix, volatile suffix) so callers can
+keep the prefix byte-identical across requests for provider-side prompt caching.
+"""
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from metrics import timed
+from retrieval import RetrievalIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ContextProfile:
+    """How one endpoint assembles its context: document sections + GitHub section."""
+    sections: tuple[tuple[str, str, int], ...]  # (header, filename, char limit)
+    github_header: str
+    github_limit: int = 4000
+    preamble: str = ""                           # prepended verbatim (e.g. a system prompt)
+
+
+class ContextStore:
+    def __init__(
+        self,
+        data_dir: Path,
+        profiles: dict[str, ContextProfile],
+        reload_interval: float = 30.0,
+        index_factory: Callable[[dict[str, str]], RetrievalIndex] | None = None,
+    ):
+        self.data_dir = data_dir
+        self.profiles = profiles
+        self.reload_interval = reload_interval
+        self.index_factory = index_factory
+        self.index: RetrievalIndex | None = None
+        self.documents: dict[str, str] = {}
+        self._mtimes: dict[str, float] = {}
+        self._blocks: dict[str, str] = {}
+        # profile → (github text it was built with, assembled prompt)
+        self._assembled: dict[str, tuple[str, str]] = {}
+        self.version = ""   # content hash of documents + profiles; equal across processes and restarts
+        self._watcher: asyncio.Task | None = None
+
+    # ── loading ──────────────────────────────────────────────────────────────
+    def _filenames(self) -> set[str]:
+        return {filename for p in self.profiles.values() for _, filename, _ in p.sections}
+
+    def _stat(self) -> dict[str, float]:
+        mtimes = {}
+        for filename in self._filenames():
+            path = self.data_dir / filename
+            mtimes[filename] = path.stat().st_mtime if path.exists() else 0.0
+        return mtimes
+
+    @timed("context_load")
+    def load(self) -> None:
+        """(Re)read every data file and rebuild the per-profile document blocks."""
+        mtimes = self._stat()
+        documents = {}
+        for filename in mtimes:
+            path = self.data_dir / filename
+            documents[filename] = path.read_text(encoding="utf-8") if path.exists() else ""
+        blocks = {}
+        for name, profile in self.profiles.items():
+            blocks[name] = "\n\n".join(
+                f"=== {header} ===\n{documents[filename][:limit]}"
+                for header, filename, limit in profile.sections
+            )
+        index = self.index_factory(documents) if self.index_factory else None
+        # Swap in one go so readers never see a half-built state
+        self.documents, self._mtimes, self._blocks, self.index = documents, mtimes, blocks, index
+        self._assembled = {}
+        self.version = self._fingerprint(documents)
+        logger.info(f"Context store loaded v{self.version}: " + ", ".join(
+            f"{f} ({len(t)} chars)" for f, t in documents.items()
+        ))
+
+    def _fingerprint(self, documents: dict[str, str]) -> str:
+        """Hash of everything prompts are built from (the documents and the profile definitions)."""
+        h = hashlib.sha256()
+        for filename in sorted(documents):
+            h.update(f"{filename}\x00{len(documents[filename])}\x00".encode())
+            h.update(documents[filename].encode())
+        h.update(repr(sorted(self.profiles.items())).encode())
+        return h.hexdigest()[:16]
+
+    def reload_if_changed(self) -> bool:
+        if self._stat() == self._mtimes:
+            return False
+        self.load()
+        return True
+
+    # ── watcher ──────────────────────────────────────────────────────────────
+    def start_watcher(self) -> None:
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop_watcher(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.warning(f"Context reload failed: {e}")
+
+    # ── hot path ─────────────────────────────────────────────────────────────
+    def prefix(self, profile_name: str) -> str:
+        """Preamble + whole documents: identical bytes until a data file changes."""
+        profile = self.profiles[profile_name]
+        block = self._blocks[profile_name]
+        return f"{profile.preamble}\n\n{block}" if profile.preamble else block
+
+    def github_section(self, profile_name: str, github: str) -> str:
+        profile = self.profiles[profile_name]
+        return f"=== {profile.github_header} ===\n{github[:profile.github_limit]}"
+
+    def split(self, profile_name: str, github: str, query: str | None = None,
+              k: int = 8, token_budget: int = 6000) -> tuple[str, str]:
+        """
+        (stable prefix, volatile suffix) for prompt-prefix caching: the prefix only
+        changes with the data files, everything per-request (retrieved excerpts,
+        GitHub activity) goes in the suffix. Without a query, `stable + "\n\n" + volatile`
+        is exactly what build() returns. Retrieval is skipped when the whole
+        corpus fits `token_budget`: excerpts would only ever be a subset of it.
+        """
+        if query is None or self.index is None or self.index.total_tokens <= token_budget:
+            return self.prefix(profile_name), self.github_section(profile_name, github)
+        profile = self.profiles[profile_name]
+        chunks = self.index.search(query, k=k, token_budget=token_budget)
+        sections = []
+        for header, filename, _ in profile.sections:
+            excerpts = [c.text for c in chunks if c.source == filename]
+            if excerpts:
+                sections.append(f"=== {header} — relevant excerpts ===\n" + "\n[…]\n".join(excerpts))
+        sections.append(self.github_section(profile_name, github))
+        volatile = "\n\n".join(sections)
+        if not profile.preamble:
+            # No stable part at all — everything is per-request
+            return "", volatile
+        return profile.preamble, volatile
+
+    def build(self, profile_name: str, github: str) -> str:
+        """Preamble + documents + GitHub section. Memoized per GitHub snapshot."""
+        cached = self._assembled.get(profile_name)
+        if cached and cached[0] == github:
+            return cached[1]
+        assembled = "\n\n".join(self.split(profile_name, github))
+        self._assembled[profile_name] = (github, assembled)
+        return assembled
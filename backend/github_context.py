@@ -0,0 +1,177 @@
+"""
+Cached GitHub context for Pai chat and haiku RAG.
+
+The repos and events/public endpoints are fetched concurrently with
+ETag / If-None-Match conditional requests, so an unchanged feed comes back as
+a cheap 304 that does not count against the rate limit. The formatted context
+is served from memory; once it is older than the TTL it is still served
+(stale-while-revalidate) while a single background task refreshes it.
+
+With a `shared` cache backend, a refresh first looks for a copy another worker
+fetched within the TTL and only goes to GitHub when there is none, publishing
+what it fetched — so N workers make one set of GitHub calls per TTL, not N.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+
+from metrics import STAGE_SECONDS
+from upstream import UpstreamPool
+
+logger = logging.getLogger(__name__)
+
+
+def format_repos(repos: list[dict]) -> str:
+    """Own repos only — exclude forks."""
+    repo_lines = []
+    for r in repos:
+        if r.get("fork", False):
+            continue
+        desc = r.get("description") or ""
+        lang = r.get("language") or ""
+        stars = r.get("stargazers_count", 0)
+        repo_lines.append(f"- {r['name']}: {desc} [{lang}] ⭐{stars}")
+    return "GITHUB REPOS (own, non-forked):\n" + "\n".join(repo_lines)
+
+
+def format_events(events: list[dict], username: str) -> str:
+    """Recent push events — only include commits authored by Pranav."""
+    event_lines = []
+    for e in events:
+        etype = e.get("type", "")
+        repo_name = e.get("repo", {}).get("name", "")
+        if etype == "PushEvent":
+            commits = e.get("payload", {}).get("commits", [])
+            for c in commits[:2]:
+                author = c.get("author", {}).get("name", "").lower()
+                if username.lower() in author or "pranav" in author or "kowadkar" in author:
+                    msg = c.get("message", "").split("\n")[0][:80]
+                    event_lines.append(f"- Commit to {repo_name}: {msg}")
+        elif etype == "CreateEvent":
+            ref_type = e.get("payload", {}).get("ref_type", "")
+            ref = e.get("payload", {}).get("ref", "")
+            if ref_type == "repository":
+                event_lines.append(f"- Created new repo: {repo_name}")
+            elif ref and ref_type == "branch":
+                event_lines.append(f"- Created branch '{ref}' in {repo_name}")
+    if event_lines:
+        return "RECENT GITHUB ACTIVITY (Pranav's own commits):\n" + "\n".join(event_lines)
+    return "RECENT GITHUB ACTIVITY: No recent public commits found."
+
+
+class GitHubContextCache:
+    """TTL + stale-while-revalidate cache of the formatted GitHub context string."""
+
+    def __init__(self, pool: UpstreamPool, api_base: str, username: str, pat: str = "", ttl: float = 300.0,
+                 shared=None):
+        self.pool = pool
+        self.shared = shared
+        self.api_base = api_base
+        self.username = username
+        self.pat = pat
+        self.ttl = ttl
+        self._context = ""
+        self._fetched_at = 0.0
+        # Per-endpoint conditional-request state: path → (etag, formatted section)
+        self._sections: dict[str, tuple[str, str]] = {}
+        self._refresh_task: asyncio.Task | None = None
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "not_modified": 0, "fetched": 0, "errors": 0,
+                         "shared_hits": 0}
+
+    @property
+    def age(self) -> float:
+        return time.time() - self._fetched_at if self._fetched_at else float("inf")
+
+    async def get(self) -> str:
+        """Return the cached context, refreshing in the background once stale."""
+        if self._fetched_at and self.age < self.ttl:
+            self.counters["hits"] += 1
+            return self._context
+        if self._fetched_at:
+            self.counters["stale_hits"] += 1
+            self.refresh_in_background()
+            return self._context
+        self.counters["misses"] += 1
+        await self._join_refresh()
+        return self._context
+
+    def refresh_in_background(self) -> asyncio.Task:
+        """Start a refresh unless one is already in flight; returns the shared task."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+        return self._refresh_task
+
+    async def _join_refresh(self) -> None:
+        # shield so a cancelled caller doesn't cancel the refresh shared with other waiters
+        await asyncio.shield(self.refresh_in_background())
+
+    @property
+    def _shared_key(self) -> str:
+        return f"github:context:{self.username}"
+
+    async def _adopt_shared(self) -> bool:
+        raw = await asyncio.to_thread(self.shared.get, self._shared_key)
+        if not raw:
+            return False
+        data = json.loads(raw)
+        if data["fetched_at"] <= self._fetched_at or time.time() - data["fetched_at"] >= self.ttl:
+            return False
+        self._context, self._fetched_at = data["context"], data["fetched_at"]
+        self.counters["shared_hits"] += 1
+        return True
+
+    async def refresh(self) -> None:
+        if self.shared is not None and await self._adopt_shared():
+            return
+        repos_path = f"/users/{self.username}/repos"
+        events_path = f"/users/{self.username}/events/public"
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            self._fetch_section(repos_path, {"sort": "updated", "per_page": 30}, format_repos),
+            self._fetch_section(
+                events_path, {"per_page": 30}, lambda events: format_events(events, self.username)
+            ),
+            return_exceptions=True,
+        )
+        failed = any(isinstance(r, Exception) for r in results)
+        # The real GitHub round trip (both endpoints); cache reads in get() aren't timed
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="github_fetch", outcome="error" if failed else "ok")
+        for r in results:
+            if isinstance(r, Exception):
+                self.counters["errors"] += 1
+                logger.warning(f"GitHub fetch failed: {r}")
+        parts = [self._sections[p][1] for p in (repos_path, events_path) if p in self._sections]
+        self._context = "\n\n".join(parts)
+        self._fetched_at = time.time()
+        if self.shared is not None and parts:
+            payload = json.dumps({"context": self._context, "fetched_at": self._fetched_at})
+            await asyncio.to_thread(self.shared.set, self._shared_key, payload, ex=math.ceil(self.ttl * 2))
+
+    async def _fetch_section(self, path: str, params: dict, formatter) -> None:
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.pat:
+            headers["Authorization"] = f"Bearer {self.pat}"
+        cached = self._sections.get(path)
+        if cached and cached[0]:
+            headers["If-None-Match"] = cached[0]
+
+        resp = await self.pool.client.get(f"{self.api_base}{path}", headers=headers, params=params)
+        if resp.status_code == 304 and cached:
+            self.counters["not_modified"] += 1
+            return
+        if resp.status_code == 200:
+            self.counters["fetched"] += 1
+            self._sections[path] = (resp.headers.get("etag", ""), formatter(resp.json()))
+            return
+        raise RuntimeError(f"GET {path} → HTTP {resp.status_code}")
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "ttl": self.ttl,
+            "age": None if not self._fetched_at else round(self.age, 1),
+            "refreshing": self._refresh_task is not None and not self._refresh_task.done(),
+        }
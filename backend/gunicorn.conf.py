@@ -0,0 +1,51 @@
+"""
+Multi-worker production profile:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Runs WEB_CONCURRENCY uvicorn workers (default: one per CPU). Each worker has its
+own event loop, upstream pools and LLM concurrency cap (LLM_MAX_IN_FLIGHT is per
+worker). With more than one worker, SHARED_STATE_URL defaults to a SQLite file
+under STATE_DIR so rate limits, circuit breakers, the GitHub context and the
+exact chat cache are shared (the haiku pool and contact outbox already are).
+
+On SIGTERM gunicorn stops accepting and each worker's readiness turns 503.
+In-flight (streaming) requests get SHUTDOWN_GRACE_PERIOD seconds to finish, then
+the lifespan shutdown drains LLM work and the outbox for up to
+SHUTDOWN_DRAIN_TIMEOUT; gunicorn's `graceful_timeout` (its kill timer for the
+whole worker shutdown) is the sum. Keep that sum below the platform's own grace
+period (Render: 30s).
+"""
+
+import multiprocessing
+import os
+import warnings
+from pathlib import Path
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from uvicorn.workers import UvicornWorker
+
+GRACE_PERIOD = int(os.getenv("SHUTDOWN_GRACE_PERIOD", "15"))
+DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))
+
+
+class GracefulUvicornWorker(UvicornWorker):
+    # Bound the wait for in-flight requests so the lifespan drain still fits graceful_timeout
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "timeout_graceful_shutdown": GRACE_PERIOD}
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = GracefulUvicornWorker
+preload_app = False                # import per worker: each needs its own loop, pools and SQLite handles
+graceful_timeout = GRACE_PERIOD + int(DRAIN_TIMEOUT) + 1
+timeout = 120                      # worker heartbeat; streamed chat replies can run long
+keepalive = 5
+accesslog = None
+
+if workers > 1 and not os.getenv("SHARED_STATE_URL"):
+    state_dir = Path(os.getenv("STATE_DIR", str(Path(__file__).parent / ".state")))
+    state_dir.mkdir(parents=True, exist_ok=True)
+    # Set before the workers fork and import main
+    os.environ["SHARED_STATE_URL"] = f"sqlite://{(state_dir / 'shared.db').resolve()}"
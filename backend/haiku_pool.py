@@ -0,0 +1,173 @@
+"""
+Persistent pool of validated haikus.
+
+Instead of one all-or-nothing set of 10, the app keeps a larger pool that is
+topped up a few haikus at a time and serves a random 10 from it per response.
+Every haiku is checked against a dedupe index over its id, its fact and its
+lines (all normalized), so small batches can't fill the pool with rewordings
+of the same story. Entries age out individually after `item_ttl`; beyond
+`max_size` the oldest are evicted first.
+
+The pool serializes to one JSON document (stored in the shared cache backend
+by the app), stamped with `updated_at` so workers can adopt a newer copy.
+Writers never store their own copy over it: `merged()` re-applies a change to
+the stored document (under the backend's lock), deduplicated the same way.
+"""
+
+import json
+import random
+import re
+import time
+
+_NORM_RE = re.compile(r"[^a-z0-9]+")
+REQUIRED_FIELDS = ("id", "lines", "fact", "emoji")
+
+
+def _norm(text: str) -> str:
+    return _NORM_RE.sub(" ", text.lower()).strip()
+
+
+def is_valid_haiku(h) -> bool:
+    return (
+        isinstance(h, dict)
+        and all(k in h for k in REQUIRED_FIELDS)
+        and isinstance(h["lines"], list) and len(h["lines"]) == 3
+        and all(isinstance(line, str) and line.strip() for line in h["lines"])
+        and isinstance(h["fact"], str) and h["fact"].strip() != ""
+        and isinstance(h["id"], str) and h["id"].strip() != ""
+    )
+
+
+class HaikuPool:
+    def __init__(self, max_size: int = 120, item_ttl: float = 7 * 86400):
+        self.max_size = max_size
+        self.item_ttl = item_ttl
+        self.entries: list[dict] = []       # haiku fields + "added_at", oldest first
+        self.updated_at = 0.0
+        self._ids: set[str] = set()
+        self._facts: set[str] = set()
+        self._lines: set[str] = set()
+        self.counters = {"added": 0, "duplicates": 0, "invalid": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # ── index ────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _keys(h: dict) -> tuple[str, str, str]:
+        return _norm(h["id"]), _norm(h["fact"]), _norm(" / ".join(h["lines"]))
+
+    def _reindex(self) -> None:
+        self._ids, self._facts, self._lines = set(), set(), set()
+        for h in self.entries:
+            hid, fact, lines = self._keys(h)
+            self._ids.add(hid)
+            self._facts.add(fact)
+            self._lines.add(lines)
+
+    def is_duplicate(self, h: dict) -> bool:
+        _, fact, lines = self._keys(h)
+        return fact in self._facts or lines in self._lines
+
+    # ── mutation ─────────────────────────────────────────────────────────────
+    def add(self, haikus: list, now: float | None = None) -> int:
+        """Add the valid, non-duplicate haikus. Returns how many were added."""
+        now = now or time.time()
+        added = 0
+        for h in haikus:
+            if not is_valid_haiku(h):
+                self.counters["invalid"] += 1
+                continue
+            if self.is_duplicate(h):
+                self.counters["duplicates"] += 1
+                continue
+            entry = {k: h[k] for k in REQUIRED_FIELDS}
+            entry["lines"] = [line.strip() for line in h["lines"]]
+            # A new fact under a taken slug keeps its haiku; only the id changes
+            base, n = entry["id"], 2
+            while _norm(entry["id"]) in self._ids:
+                entry["id"] = f"{base}-{n}"
+                n += 1
+            entry["added_at"] = now
+            self.entries.append(entry)
+            hid, fact, lines = self._keys(entry)
+            self._ids.add(hid)
+            self._facts.add(fact)
+            self._lines.add(lines)
+            added += 1
+        self.counters["added"] += added
+        if added:
+            self._trim(now)
+            self.updated_at = now
+        return added
+
+    def expire(self, now: float | None = None) -> int:
+        now = now or time.time()
+        before = len(self.entries)
+        self.entries = [h for h in self.entries if now - h["added_at"] < self.item_ttl]
+        removed = before - len(self.entries)
+        if removed:
+            self.counters["expired"] += removed
+            self._reindex()
+        return removed
+
+    def _trim(self, now: float) -> None:
+        self.expire(now)
+        overflow = len(self.entries) - self.max_size
+        if overflow > 0:
+            del self.entries[:overflow]
+            self.counters["evicted"] += overflow
+            self._reindex()
+
+    # ── reads ────────────────────────────────────────────────────────────────
+    def sample(self, n: int = 10) -> list[dict]:
+        picked = random.sample(self.entries, min(n, len(self.entries)))
+        return [{k: h[k] for k in REQUIRED_FIELDS} for h in picked]
+
+    def newest_at(self) -> float:
+        return max((h["added_at"] for h in self.entries), default=0.0)
+
+    def avoid_list(self, limit: int = 40) -> list[str]:
+        """Facts already covered (most recent first) — fed back into prompts to steer away from repeats."""
+        return [h["fact"] for h in reversed(self.entries[-limit:])]
+
+    # ── persistence ──────────────────────────────────────────────────────────
+    def dumps(self) -> str:
+        return json.dumps({"updated_at": self.updated_at, "entries": self.entries}, ensure_ascii=False)
+
+    def merged(self, raw: str | None, haikus: list, now: float | None = None) -> tuple[str, int]:
+        """
+        The stored pool `raw` plus `haikus` (deduplicated, expired, trimmed), serialized,
+        and how many were added. Our own entries are left alone — adopt() the result.
+        """
+        now = now or time.time()
+        pool = HaikuPool(max_size=self.max_size, item_ttl=self.item_ttl)
+        pool.adopt(raw)
+        expired = pool.expire(now)
+        added = pool.add(haikus, now)
+        if added or expired:
+            pool.updated_at = max(now, pool.updated_at + 1e-6)
+        for name in ("added", "duplicates", "invalid", "evicted"):
+            self.counters[name] += pool.counters[name]
+        return pool.dumps(), added
+
+    def adopt(self, raw: str | None) -> bool:
+        """Replace our entries with a serialized pool if it is newer than ours."""
+        if not raw:
+            return False
+        data = json.loads(raw)
+        if data.get("updated_at", 0) <= self.updated_at:
+            return False
+        self.entries = [h for h in data.get("entries", []) if is_valid_haiku(h) and "added_at" in h]
+        self.updated_at = data["updated_at"]
+        self._reindex()
+        return True
+
+    def stats(self) -> dict:
+        newest = self.newest_at()
+        return {
+            **self.counters,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "newest_age_s": round(time.time() - newest) if newest else None,
+        }
@@ -0,0 +1,157 @@
+"""
+Incremental parsing and validation of streamed haiku JSON.
+
+Models answer the haiku prompt with a JSON array of objects, or an object that
+wraps one (`{"haikus": [...]}`, `{"data": [...]}`, ...), sometimes inside a
+markdown fence. Rather than buffering the whole completion and `json.loads`-ing
+it — where one bad character loses every haiku — `HaikuStreamParser` scans the
+text as it arrives and emits each object that is an element of an array as soon
+as its closing brace is seen. The wrapper shape doesn't matter, a malformed item
+only loses that item, and everything completed before a truncation is kept.
+
+`HaikuCollector` validates each item (schema, 3 non-empty lines, 5-7-5 by a
+local syllable counter) and reports when enough valid haikus have arrived, so
+the caller can close the stream instead of paying for the rest of it.
+"""
+
+import json
+import re
+
+from haiku_pool import is_valid_haiku
+
+HAIKU_PATTERN = (5, 7, 5)
+
+# ─── Syllables ────────────────────────────────────────────────────────────────
+# An English heuristic (vowel groups + common silent-letter rules), not a
+# dictionary: expect ±1 on unusual words, hence the tolerance in syllables_ok().
+_WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?|\d+")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_DIGIT_SYLLABLES = {"0": 2, "1": 1, "2": 1, "3": 1, "4": 1, "5": 1, "6": 1, "7": 2, "8": 1, "9": 1}
+_SILENT_ES = ("ses", "zes", "ches", "shes", "ges", "ces", "xes")
+_EXCEPTIONS = {
+    "the": 1, "every": 2, "people": 2, "business": 2, "different": 3, "evening": 2,
+    "being": 2, "science": 2, "quiet": 2, "poem": 2, "create": 2, "idea": 3, "area": 3,
+}
+
+
+def word_syllables(word: str) -> int:
+    if word.isdigit():
+        # Read digit by digit ("2024" → two-zero-two-four); close enough for years and counts
+        return sum(_DIGIT_SYLLABLES[d] for d in word)
+    if word.isupper() and 2 <= len(word) <= 4:
+        # Acronyms are spelled out: "NYC" → en-why-see, "AI" → ay-eye
+        return sum(3 if ch == "W" else 1 for ch in word)
+    w = word.lower().replace("'", "")
+    if w in _EXCEPTIONS:
+        return _EXCEPTIONS[w]
+    count = len(_VOWEL_GROUP_RE.findall(w))
+    if count > 1:
+        if w.endswith("e") and not w.endswith(("le", "ee", "ye")):
+            count -= 1                      # silent e: "stone", "make"
+        elif w.endswith("ed") and not w.endswith(("ted", "ded")):
+            count -= 1                      # "jumped", "planned"
+        elif w.endswith("es") and not w.endswith(_SILENT_ES):
+            count -= 1                      # "makes", "lines"
+    return max(1, count)
+
+
+def line_syllables(line: str) -> int:
+    return sum(word_syllables(w) for w in _WORD_RE.findall(line))
+
+
+def syllables_ok(lines: list[str], tolerance: int = 1) -> bool:
+    """Each line within `tolerance` of 5-7-5. A negative tolerance disables the check."""
+    if tolerance < 0:
+        return True
+    return all(abs(line_syllables(line) - want) <= tolerance for line, want in zip(lines, HAIKU_PATTERN))
+
+
+# ─── Incremental parser ───────────────────────────────────────────────────────
+_SIGNIFICANT_RE = re.compile(r'[{}\[\]"\\]')
+
+
+class HaikuStreamParser:
+    """
+    Feed text chunks; get back every JSON object that is a direct element of an
+    array, as soon as it is complete. Only brackets, quotes and backslashes are
+    inspected (by regex), and only the current item's text is kept.
+    """
+
+    def __init__(self):
+        self._stack: list[str] = []      # open brackets, outermost first
+        self._in_string = False
+        self._escaped = False            # a backslash ended the previous chunk
+        self._item: list[str] | None = None
+        self._item_depth = 0             # stack depth the current item closes back to
+        self.malformed = 0
+
+    def feed(self, text: str) -> list:
+        items = []
+        start = 0 if self._item is not None else None
+        skip_to = 0
+        if self._escaped:
+            skip_to, self._escaped = 1, False
+        for m in _SIGNIFICANT_RE.finditer(text):
+            i, ch = m.start(), m.group()
+            if i < skip_to:
+                continue
+            if self._in_string:
+                if ch == "\\":
+                    skip_to = i + 2
+                    if skip_to > len(text):
+                        self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = bool(self._stack)
+            elif ch == "\\":
+                continue
+            elif ch in "{[":
+                if ch == "{" and self._item is None and self._stack and self._stack[-1] == "[":
+                    self._item, self._item_depth, start = [], len(self._stack), i
+                self._stack.append(ch)
+            else:
+                if self._stack:
+                    self._stack.pop()
+                if self._item is not None and len(self._stack) == self._item_depth:
+                    self._item.append(text[start:i + 1])
+                    raw, self._item, start = "".join(self._item), None, None
+                    try:
+                        items.append(json.loads(raw))
+                    except ValueError:
+                        self.malformed += 1
+        if self._item is not None and start is not None:
+            self._item.append(text[start:])
+        return items
+
+
+class HaikuCollector:
+    """Validates parsed items as they stream in; `feed()` returns True once `want` are accepted."""
+
+    def __init__(self, want: int, syllable_tolerance: int = 1):
+        self.want = want
+        self.syllable_tolerance = syllable_tolerance
+        self.parser = HaikuStreamParser()
+        self.accepted: list[dict] = []
+        self.counts = {"accepted": 0, "invalid": 0, "syllables": 0}
+
+    @property
+    def done(self) -> bool:
+        return len(self.accepted) >= self.want
+
+    def feed(self, text: str) -> bool:
+        for item in self.parser.feed(text):
+            if self.done:
+                break
+            if not is_valid_haiku(item):
+                self.counts["invalid"] += 1
+            elif not syllables_ok(item["lines"], self.syllable_tolerance):
+                self.counts["syllables"] += 1
+            else:
+                self.accepted.append(item)
+                self.counts["accepted"] += 1
+        return self.done
+
+    def stats(self) -> dict:
+        return {**self.counts, "malformed": self.parser.malformed}
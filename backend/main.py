@@ -4,10 +4,16 @@ FastAPI backend for pkowadkar-portfolio.
 
 Endpoints:
   GET  /                  → root health check
-  GET  /api/health        → UptimeRobot keep-alive ping
-  POST /api/contact       → contact form → Gmail SMTP
-  GET  /api/haiku         → dynamically generated haikus via RAG (24h cache)
+  GET  /api/health        → UptimeRobot keep-alive ping (liveness; reports readiness too)
+  GET  /api/health/ready  → readiness probe: 503 until the startup warm-up has finished
+                            and again while draining on shutdown
+  POST /api/contact       → contact form → background outbox → Gmail SMTP
+  GET  /api/haiku         → haikus sampled from a persistent pool, replenished via RAG in the background
+                            (?refresh=true runs one round now: X-Refresh-Token or rate-limited)
   POST /api/chat          → Pai — Pranav's AI Guide (multi-model OpenRouter fallback)
+                            ("stream": true → Server-Sent Events, falling back before the first token)
+  GET  /api/diagnostics   → internal runtime state (pools, caches, admission, model stats, breakers)
+  GET  /metrics           → Prometheus text metrics (route latency, per-stage timings, tokens)
 
 AI Strategy (all via OpenRouter):
   Chat  fallback chain: gemini-3.1-pro-preview → claude-sonnet-4.6 → gpt-4.1
@@ -18,24 +24,97 @@ AI Strategy (all via OpenRouter):
 
 import os
 import json
+import hashlib
+import hmac
+import math
+import secrets
+import asyncio
 import time
-import smtplib
 import logging
 import random
+import re
+import signal
+import socket
 import httpx
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, Callable
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from context_store import ContextProfile, ContextStore
+from github_context import GitHubContextCache
+from haiku_pool import HaikuPool
+from haiku_stream import HaikuCollector
+from admission import ConcurrencyLimiter, RateLimited, RateLimiter, Rejected, SharedRateLimiter
+from cache_backends import SQLiteBackend, delete_if, make_cache_backend, update
+from circuit_breaker import BreakerRegistry
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    FALLBACK_DEPTH,
+    HAIKU_ITEMS,
+    MODEL_ATTEMPT_SECONDS,
+    MODEL_ATTEMPTS,
+    REGISTRY as METRICS,
+    REJECTED,
+    STAGE_SECONDS,
+    TOKENS,
+    UPSTREAM_STATUS,
+    MetricsMiddleware,
+    timed,
+)
+from model_stats import ModelStatsRegistry, rank_models
+from outbox import ContactOutbox, OutboxJournal, OutgoingEmail, SMTPSession
+from response_cache import ResponseCache, history_fingerprint
+from retrieval import RetrievalIndex
+from token_budget import count_tokens, fit_messages, pack_history
+from upstream import UpstreamPool
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="pk-portfolio-backend", version="3.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load RAG context, open upstream pools and start the mail outbox, then warm up in the
+    background (the port opens right away). On shutdown (after the server has let in-flight
+    requests finish), stop background LLM work, drain the outbox and close the pools.
+    """
+    startup["lifespan_at"] = time.time()
+    install_drain_handler()
+    context_store.load()
+    context_store.start_watcher()
+    if await load_persisted_haikus():
+        logger.info(f"Loaded persisted haiku pool ({len(haiku_pool)} haikus)")
+    await openrouter_pool.start()
+    await github_pool.start()
+    contact_outbox.start()
+    start_haiku_replenisher()
+    start_warmup()
+    try:
+        yield
+    finally:
+        mark_draining()
+        # One budget for the whole drain: each step gets what the previous ones left
+        deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+        await stop_warmup()
+        await stop_haiku_replenisher()
+        if not await llm_limiter.drain(max(0.0, deadline - time.monotonic())):
+            logger.warning(f"Shutting down with {llm_limiter.in_flight} LLM call(s) still in flight")
+        await contact_outbox.stop(drain_timeout=max(0.0, deadline - time.monotonic()))
+        await context_store.stop_watcher()
+        await openrouter_pool.close()
+        await github_pool.close()
+
+
+app = FastAPI(title="pk-portfolio-backend", version="3.0.0", lifespan=lifespan)
 
 # ─── CORS ─────────────────────────────────────────────────────────────────────
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -46,6 +125,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # ─── Config ───────────────────────────────────────────────────────────────────
 SMTP_HOST        = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -53,14 +133,62 @@ SMTP_PORT        = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER        = os.getenv("SMTP_USER", "")
 SMTP_PASS        = os.getenv("SMTP_PASS", "")
 RECIPIENT_EMAIL  = os.getenv("RECIPIENT_EMAIL", "pranav.kowadkar@gmail.com")
+SMTP_BATCH_SIZE  = int(os.getenv("SMTP_BATCH_SIZE", "20"))
+SMTP_MAX_ATTEMPTS = int(os.getenv("SMTP_MAX_ATTEMPTS", "5"))
+OUTBOX_RETENTION = float(os.getenv("OUTBOX_RETENTION", "86400"))  # keep delivered/failed mail 24h (dedupe window)
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 GITHUB_PAT       = os.getenv("GITHUB_PAT", "")
 GITHUB_USERNAME  = os.getenv("GITHUB_USERNAME", "p-kowadkar")
-HAIKU_CACHE_TTL  = int(os.getenv("HAIKU_CACHE_TTL", "86400"))  # 24h default
-
-OPENROUTER_BASE  = "https://openrouter.ai/api/v1/chat/completions"
+HAIKU_CACHE_TTL  = int(os.getenv("HAIKU_CACHE_TTL", "86400"))  # top up with fresh haikus at least daily
+HAIKU_CACHE_URL  = os.getenv("HAIKU_CACHE_URL", "")             # memory:// | file:// | sqlite:// | redis://
+GITHUB_CACHE_TTL = int(os.getenv("GITHUB_CACHE_TTL", "300"))    # 5 min default
+HAIKU_REFRESH_TOKEN = os.getenv("HAIKU_REFRESH_TOKEN", "")       # required for ?refresh=true when set
+HAIKU_REFRESH_MIN_INTERVAL = int(os.getenv("HAIKU_REFRESH_MIN_INTERVAL", "300"))  # otherwise: once per 5 min
+HAIKU_POOL_TARGET     = int(os.getenv("HAIKU_POOL_TARGET", "40"))       # keep at least this many haikus
+HAIKU_POOL_MAX        = int(os.getenv("HAIKU_POOL_MAX", "120"))         # oldest evicted beyond this
+HAIKU_POOL_ITEM_TTL   = int(os.getenv("HAIKU_POOL_ITEM_TTL", "604800")) # each haiku retires after 7 days
+HAIKU_BATCH_SIZE      = int(os.getenv("HAIKU_BATCH_SIZE", "4"))         # haikus per LLM call
+HAIKU_BATCH_CONCURRENCY = int(os.getenv("HAIKU_BATCH_CONCURRENCY", "3"))  # calls per replenish round
+HAIKU_POOL_CHECK_INTERVAL = float(os.getenv("HAIKU_POOL_CHECK_INTERVAL", "60"))
+HAIKUS_PER_RESPONSE   = 10
+HAIKU_SPARE           = int(os.getenv("HAIKU_SPARE", "2"))    # extra haikus requested per batch
+HAIKU_STREAM          = os.getenv("HAIKU_STREAM", "true").lower() == "true"   # stop once a batch is full
+HAIKU_SYLLABLE_TOLERANCE = int(os.getenv("HAIKU_SYLLABLE_TOLERANCE", "1"))  # ±syllables per line; -1 = off
+
+OPENROUTER_BASE  = os.getenv("OPENROUTER_BASE", "https://openrouter.ai/api/v1/chat/completions")
 OPENROUTER_REFERER = "https://www.pkowadkar.com"
 OPENROUTER_TITLE   = "pk-portfolio"
+GITHUB_API_BASE  = os.getenv("GITHUB_API_BASE", "https://api.github.com")
+
+# ─── Upstream connection pools ────────────────────────────────────────────────
+# One keep-alive pool per upstream host, shared for the lifetime of the app.
+HTTP2_ENABLED         = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+HTTP_MAX_CONNECTIONS  = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE    = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Startup warm-up: pre-open upstream connections and fill caches before the first visitor
+WARMUP_ENABLED   = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT   = float(os.getenv("WARMUP_TIMEOUT", "20"))   # ready regardless after this
+
+openrouter_pool = UpstreamPool(
+    "openrouter",
+    OPENROUTER_BASE,
+    http2=HTTP2_ENABLED,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    timeout=45.0,
+)
+github_pool = UpstreamPool(
+    "github",
+    GITHUB_API_BASE,
+    http2=HTTP2_ENABLED,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive=HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    timeout=10.0,
+)
 
 # ─── Model fallback chains ────────────────────────────────────────────────────
 # Chat: pro-level models with 1M+ context, cascading to free fallbacks
@@ -81,17 +209,192 @@ HAIKU_MODELS = [
     "mistralai/mistral-small-3.1-24b-instruct:free",  # Fallback 4: free
 ]
 
+# Context windows (tokens) — prompts are trimmed per model to fit
+MODEL_CONTEXT_WINDOWS = {
+    "google/gemini-3.1-pro-preview": 1_048_576,
+    "anthropic/claude-sonnet-4.6": 1_000_000,
+    "openai/gpt-4.1": 1_047_576,
+    "qwen/qwen3-235b-a22b": 131_072,
+    "openai/gpt-oss-120b:free": 131_072,
+    "google/gemini-3-flash-preview": 1_048_576,
+    "openai/gpt-4.1-mini": 1_047_576,
+    "anthropic/claude-haiku-4.5": 200_000,
+    "openai/gpt-5-mini": 400_000,
+    "mistralai/mistral-small-3.1-24b-instruct:free": 128_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# Chat token budgets: history beyond the budget is summarized; max_tokens caps the visible
+# answer (a short paragraph, more when the visitor asks for detail)
+CHAT_HISTORY_MAX_TURNS    = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "20"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "4000"))
+CHAT_MAX_TOKENS           = int(os.getenv("CHAT_MAX_TOKENS", "2048"))
+CHAT_MAX_TOKENS_LONG      = int(os.getenv("CHAT_MAX_TOKENS_LONG", "4096"))
+
+# Models that think before answering count their reasoning tokens against max_tokens, so
+# a plain answer cap would truncate them. They get an explicit OpenRouter reasoning budget
+# (reasoning.max_tokens, reasoning text excluded from the response) added on top of the cap.
+REASONING_MODELS = (
+    "google/gemini-3.1-pro-preview",
+    "qwen/qwen3-235b-a22b",
+    "openai/gpt-oss-120b:free",
+    "openai/gpt-5-mini",
+)
+REASONING_MAX_TOKENS      = int(os.getenv("REASONING_MAX_TOKENS", "2048"))
+
+# Fallback strategy: "sequential" tries one model at a time; "hedged" launches the next
+# model in parallel once the current one exceeds its hedge delay (first success wins).
+FALLBACK_STRATEGY   = os.getenv("FALLBACK_STRATEGY", "sequential")
+HEDGE_DELAY         = os.getenv("HEDGE_DELAY", "auto")       # seconds, or "auto" = primary's p95
+HEDGE_DELAY_DEFAULT = float(os.getenv("HEDGE_DELAY_DEFAULT", "8"))
+HEDGE_DELAY_MIN     = float(os.getenv("HEDGE_DELAY_MIN", "2"))
+HEDGE_DELAY_MAX     = float(os.getenv("HEDGE_DELAY_MAX", "20"))
+HEDGE_MAX_PARALLEL  = int(os.getenv("HEDGE_MAX_PARALLEL", "2"))
+
+# Circuit breakers: skip a model after repeated 429/5xx/timeouts, probe again after a cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_BASE_COOLDOWN     = float(os.getenv("BREAKER_BASE_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN      = float(os.getenv("BREAKER_MAX_COOLDOWN", "600"))
+ADAPTIVE_ORDERING         = os.getenv("ADAPTIVE_ORDERING", "true").lower() == "true"
+
+# Chat response cache
+CHAT_CACHE_ENABLED  = os.getenv("CHAT_CACHE_ENABLED", "true").lower() == "true"
+CHAT_CACHE_SIZE     = int(os.getenv("CHAT_CACHE_SIZE", "512"))
+CHAT_CACHE_TTL      = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SEMANTIC = os.getenv("CHAT_CACHE_SEMANTIC", "true").lower() == "true"
+CHAT_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("CHAT_CACHE_SEMANTIC_THRESHOLD", "0.92"))
+
+# Provider prompt caching: the chat system prompt starts with a byte-stable prefix
+# (persona + documents); models matching these prefixes also get an explicit
+# cache_control breakpoint after it (others cache stable prefixes automatically)
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+PROMPT_CACHE_BREAKPOINT_MODELS = [
+    p.strip() for p in os.getenv("PROMPT_CACHE_BREAKPOINT_MODELS", "anthropic/,google/").split(",") if p.strip()
+]
+
+# Admission control: per-client token buckets on the LLM-backed endpoints, and a
+# global cap on in-flight LLM work with a short bounded queue (429 / 503 + Retry-After)
+CHAT_RATE_PER_MIN       = float(os.getenv("CHAT_RATE_PER_MIN", "12"))
+CHAT_RATE_BURST         = float(os.getenv("CHAT_RATE_BURST", "6"))
+HAIKU_REFRESH_RATE_PER_MIN = float(os.getenv("HAIKU_REFRESH_RATE_PER_MIN", "1"))
+HAIKU_REFRESH_RATE_BURST   = float(os.getenv("HAIKU_REFRESH_RATE_BURST", "2"))
+RATE_LIMIT_MAX_CLIENTS  = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_PROXY_HOPS   = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1"))   # trusted proxies appending X-Forwarded-For
+LLM_MAX_IN_FLIGHT       = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_MAX_QUEUE           = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT       = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+
+# ─── Pai persona ──────────────────────────────────────────────────────────────
+PAI_SYSTEM_PROMPT = """🎬 You are Pai — Pranav Kowadkar's AI Guide, embedded in his portfolio.
+You are a vivid, articulate narrator of his professional journey. Speak with cinematic clarity,
+grounded confidence, and human warmth. You are NOT Pranav himself — you are his assistant,
+always speaking in third person about Pranav.
+
+IDENTITY: If addressed as "Pranav" or asked if you ARE Pranav, respond:
+"I'm Pai — Pranav's AI Guide. Let's explore his journey together."
+
+Always speak in third person. Never impersonate Pranav. Never say "I" when referring to
+Pranav's experiences. Never robotic. Never start responses with "Certainly!" or "Great question!"
+— just answer naturally. Keep responses conversational and complete — never cut off mid-sentence.
+Avoid bullet lists; write in flowing prose. Aim for 2-4 sentences for simple questions, a short
+paragraph for complex ones. Occasionally drop a fun fact about Pranav's past when it's relevant.
+
+CRITICAL RULES:
+- ALWAYS speak in third person. Say "Pranav built" not "I built".
+- Do NOT discuss technical implementation details of Project Poltergeist beyond its multi-agent architecture.
+- If asked something off-topic: "We're drifting off-track — let's get back to Pranav's journey."
+- If asked about visa/sponsorship: "Pranav will require future work authorization sponsorship. For specifics, contact him directly."
+- If someone asks to contact Pranav, direct them to pk.kowadkar@gmail.com or LinkedIn (linkedin.com/in/pkowadkar).
+- If you don't know something specific, say "I'm not sure about that one — reach out to Pranav directly."
+
+EASTER EGGS:
+- Hidden haiku poems are scattered throughout the portfolio. Trigger: Konami code (↑↑↓↓←→←→BA).
+- If asked about easter eggs or haikus, confirm they exist and hint at the Konami code."""
+
+
+# ─── Local state (outbox journal, caches) ─────────────────────────────────────
+STATE_DIR = Path(os.getenv("STATE_DIR", str(Path(__file__).parent / ".state")))
+
+# ─── Multi-worker shared state ────────────────────────────────────────────────
+# With several worker processes (gunicorn.conf.py), rate-limit buckets, circuit breakers,
+# the GitHub context and exact chat-cache entries are shared through this backend so
+# limits hold host-wide and upstream calls aren't multiplied per worker. Empty = each
+# process keeps its own (single worker). Rate limits need sqlite:// to be shared.
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+shared_state = make_cache_backend(SHARED_STATE_URL) if SHARED_STATE_URL else None
+
+# On SIGTERM: readiness turns 503 and the server gives in-flight requests SHUTDOWN_GRACE_PERIOD
+# (uvicorn --timeout-graceful-shutdown / gunicorn.conf.py); then the lifespan gets this long, in
+# total, for leftover LLM work and due emails. Grace period + drain must stay below the
+# platform's kill timeout (Render: 30s by default).
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))
+
 # ─── Data files ───────────────────────────────────────────────────────────────
+# Loaded once at startup and pre-assembled per endpoint; a watcher reloads on mtime change.
 DATA_DIR = Path(__file__).parent / "data"
+CONTEXT_RELOAD_INTERVAL = float(os.getenv("CONTEXT_RELOAD_INTERVAL", "30"))
+
+# Chat retrieval: "retrieval" sends only the top-k relevant chunks, "full" sends whole documents
+RAG_MODE         = os.getenv("RAG_MODE", "retrieval")
+RAG_INDEX        = os.getenv("RAG_INDEX", "hybrid")   # bm25 | vector | hybrid
+RAG_TOP_K        = int(os.getenv("RAG_TOP_K", "8"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "6000"))
+RAG_CHUNK_CHARS  = int(os.getenv("RAG_CHUNK_CHARS", "1200"))
+
+
+def build_retrieval_index(documents: dict[str, str]) -> RetrievalIndex:
+    return RetrievalIndex(documents, mode=RAG_INDEX, chunk_chars=RAG_CHUNK_CHARS)
+
+
+context_store = ContextStore(
+    DATA_DIR,
+    profiles={
+        "chat": ContextProfile(
+            sections=(
+                ("PRANAV'S JOURNEY (complete)", "journey.txt", 25000),
+                ("MASTER RESUME", "resume.txt", 8000),
+            ),
+            github_header="GITHUB ACTIVITY (live)",
+            preamble=PAI_SYSTEM_PROMPT,
+        ),
+        "haiku": ContextProfile(
+            sections=(
+                ("JOURNEY DOCUMENT", "journey.txt", 20000),
+                ("MASTER RESUME", "resume.txt", 8000),
+            ),
+            github_header="GITHUB CONTEXT",
+        ),
+    },
+    reload_interval=CONTEXT_RELOAD_INTERVAL,
+    index_factory=build_retrieval_index if RAG_MODE == "retrieval" else None,
+)
 
-def load_text(filename: str) -> str:
-    path = DATA_DIR / filename
-    if path.exists():
-        return path.read_text(encoding="utf-8")
-    return ""
-
-# ─── Haiku cache ──────────────────────────────────────────────────────────────
-_haiku_cache: dict = {"haikus": [], "generated_at": 0}
+# ─── Haiku pool ───────────────────────────────────────────────────────────────
+# A pool of validated haikus is persisted in a shared backend (SQLite under STATE_DIR by
+# default) so warm starts and every worker draw from one pool; haiku_pool is this process's
+# copy. It is topped up in the background a few haikus at a time (see haiku_pool.py).
+haiku_store = make_cache_backend(HAIKU_CACHE_URL) if HAIKU_CACHE_URL else SQLiteBackend(STATE_DIR / "cache.db")
+HAIKU_POOL_KEY = "haiku:pool"
+HAIKU_LOCK_KEY = "haiku:lock"   # held by whichever worker is replenishing
+HAIKU_CALL_TIMEOUT = 30.0       # per model: time to first token, and each read after it
+# The lock must outlive the slowest possible round: an LLM queue wait, the GitHub fetch,
+# every haiku model timing out before its first token, and one more call to finish the batch
+HAIKU_LOCK_TTL = float(os.getenv("HAIKU_LOCK_TTL") or 0) or (
+    LLM_QUEUE_TIMEOUT + github_pool.timeout + (len(HAIKU_MODELS) + 1) * HAIKU_CALL_TIMEOUT
+)
+haiku_pool = HaikuPool(max_size=HAIKU_POOL_MAX, item_ttl=HAIKU_POOL_ITEM_TTL)
+_haiku_fill_task: asyncio.Task | None = None    # the one in-flight replenish round, shared by all callers
+_haiku_replenisher: asyncio.Task | None = None
+_last_forced_refresh = 0.0
+
+# Each concurrent batch in a round is pointed at a different source, for variety
+HAIKU_FOCUSES = (
+    "the journey document",
+    "the master resume",
+    "the GitHub activity",
+    "the journey document — the most personal, human moments",
+    "any source (wildcard)",
+)
 
 FALLBACK_HAIKUS = [
     {"id": "planes",    "lines": ["Fifteen planes take flight", "Balsa wood, midnight solder", "Belagavi dreams"],          "fact": "Built 15 RC planes + 4 quadcopters from scratch in college", "emoji": "✈️"},
@@ -108,6 +411,122 @@ FALLBACK_HAIKUS = [
 
 
 # ─── OpenRouter helper ────────────────────────────────────────────────────────
+model_stats = ModelStatsRegistry()
+breakers = BreakerRegistry(
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    base_cooldown=BREAKER_BASE_COOLDOWN,
+    max_cooldown=BREAKER_MAX_COOLDOWN,
+    shared=shared_state,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+# ─── Admission control ────────────────────────────────────────────────────────
+def make_rate_limiter(name: str, per_min: float, burst: float) -> RateLimiter:
+    if hasattr(shared_state, "transaction"):
+        return SharedRateLimiter(shared_state, name, per_min / 60, burst, max_clients=RATE_LIMIT_MAX_CLIENTS)
+    if shared_state is not None:
+        logger.warning(f"SHARED_STATE_URL is not sqlite:// — {name} rate limits stay per worker")
+    return RateLimiter(per_min / 60, burst, max_clients=RATE_LIMIT_MAX_CLIENTS)
+
+
+chat_limiter = make_rate_limiter("chat", CHAT_RATE_PER_MIN, CHAT_RATE_BURST)
+haiku_refresh_limiter = make_rate_limiter("haiku_refresh", HAIKU_REFRESH_RATE_PER_MIN, HAIKU_REFRESH_RATE_BURST)
+llm_limiter = ConcurrencyLimiter(LLM_MAX_IN_FLIGHT, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+
+
+def client_key(request: Request) -> str:
+    """
+    Client IP for rate limiting. Behind RATE_LIMIT_PROXY_HOPS trusted proxies the
+    address they appended to X-Forwarded-For is used; anything further left is
+    client-supplied and could be spoofed.
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and RATE_LIMIT_PROXY_HOPS > 0:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            return hops[-min(RATE_LIMIT_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+
+def rejection(e: Rejected) -> HTTPException:
+    REJECTED.inc(reason=e.reason)
+    if isinstance(e, RateLimited):
+        return HTTPException(
+            status_code=429,
+            detail="Slow down a little — too many requests. Try again shortly.",
+            headers={"Retry-After": e.retry_after_header},
+        )
+    return HTTPException(
+        status_code=503,
+        detail="Pai is handling a lot of conversations right now — try again in a moment.",
+        headers={"Retry-After": e.retry_after_header},
+    )
+
+
+def _openrouter_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "HTTP-Referer": OPENROUTER_REFERER,
+        "X-Title": OPENROUTER_TITLE,
+        "Content-Type": "application/json",
+    }
+
+
+def _system_message(stable: str, volatile: str) -> dict:
+    """System message as a cacheable prefix part + a per-request part."""
+    if not stable:
+        return {"role": "system", "content": volatile}
+    if not PROMPT_CACHE_ENABLED:
+        return {"role": "system", "content": f"{stable}\n\n{volatile}"}
+    return {
+        "role": "system",
+        "content": [
+            {"type": "text", "text": stable, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": volatile},
+        ],
+    }
+
+
+def _message_text(message: dict) -> str:
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return "\n\n".join(part["text"] for part in content if part.get("type") == "text")
+
+
+def _reasoning_budget(model: str, max_tokens: int) -> tuple[int, dict | None]:
+    """(max_tokens, reasoning payload): reasoning models get REASONING_MAX_TOKENS on top of the answer cap."""
+    if model not in REASONING_MODELS:
+        return max_tokens, None
+    return max_tokens + REASONING_MAX_TOKENS, {"max_tokens": REASONING_MAX_TOKENS, "exclude": True}
+
+
+def _prepare_messages(model: str, messages: list[dict], max_tokens: int) -> tuple[list[dict], int]:
+    """
+    Tailor a prompt to one model: trim history to fit its context window (and
+    clamp max_tokens to what's left), and keep cache_control breakpoints only for
+    providers that honour them — everyone else gets plain-string content with the
+    same bytes (stable prefix first).
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    fitted, max_tokens = fit_messages(messages, window, max_tokens)
+    if len(fitted) < len(messages):
+        logger.info(f"Trimmed {len(messages) - len(fitted)} history messages to fit {model} ({window} tokens)")
+    if not any(model.startswith(p) for p in PROMPT_CACHE_BREAKPOINT_MODELS):
+        fitted = [
+            m if isinstance(m["content"], str) else {**m, "content": _message_text(m)}
+            for m in fitted
+        ]
+    return fitted, max_tokens
+
+
+# Buffered calls are timed as openrouter_call; streamed ones (stream_with_fallback) as
+# openrouter_ttft (to first token, per attempt) and openrouter_stream (whole completion)
+@timed("openrouter_call")
 async def call_openrouter(
     model: str,
     messages: list[dict],
@@ -115,40 +534,167 @@ async def call_openrouter(
     max_tokens: int = 8192,
     response_format: dict | None = None,
     timeout: float = 45.0,
+    usage: dict | None = None,
 ) -> str:
     """
     Call OpenRouter with the given model and messages.
-    Returns the assistant's text content.
+    Returns the assistant's text content. If `usage` is given it is filled from
+    the response's usage field (incl. prompt_tokens_details.cached_tokens).
     Raises httpx.HTTPStatusError or Exception on failure.
     """
     if not OPENROUTER_API_KEY:
         raise RuntimeError("OPENROUTER_API_KEY not set")
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "HTTP-Referer": OPENROUTER_REFERER,
-        "X-Title": OPENROUTER_TITLE,
-        "Content-Type": "application/json",
-    }
-
+    max_tokens, reasoning = _reasoning_budget(model, max_tokens)
+    messages, max_tokens = _prepare_messages(model, messages, max_tokens)
     payload: dict = {
         "model": model,
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
+        "usage": {"include": True},
     }
     if response_format:
         payload["response_format"] = response_format
+    if reasoning:
+        payload["reasoning"] = reasoning
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        resp = await client.post(OPENROUTER_BASE, headers=headers, json=payload)
-        resp.raise_for_status()
-        data = resp.json()
+    resp = await openrouter_pool.client.post(
+        OPENROUTER_BASE, headers=_openrouter_headers(), json=payload, timeout=timeout
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    if usage is not None and data.get("usage"):
+        usage.update(data["usage"])
 
     # OpenRouter returns OpenAI-compatible response
     return data["choices"][0]["message"]["content"]
 
 
+async def call_openrouter_stream(
+    model: str,
+    messages: list[dict],
+    temperature: float = 0.8,
+    max_tokens: int = 8192,
+    timeout: float = 45.0,
+    usage: dict | None = None,
+    response_format: dict | None = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a completion from OpenRouter (`stream: true`), yielding text deltas.
+    If `usage` is given it is filled from the final usage chunk.
+    Raises httpx.HTTPStatusError or Exception on failure.
+    """
+    if not OPENROUTER_API_KEY:
+        raise RuntimeError("OPENROUTER_API_KEY not set")
+
+    max_tokens, reasoning = _reasoning_budget(model, max_tokens)
+    messages, max_tokens = _prepare_messages(model, messages, max_tokens)
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True,
+        "usage": {"include": True},
+    }
+    if response_format:
+        payload["response_format"] = response_format
+    if reasoning:
+        payload["reasoning"] = reasoning
+    async with openrouter_pool.client.stream(
+        "POST", OPENROUTER_BASE, headers=_openrouter_headers(), json=payload, timeout=timeout
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            # SSE: "data: {...}" lines; ": OPENROUTER PROCESSING" comments keep the socket alive
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if "error" in chunk:
+                raise RuntimeError(f"Upstream stream error: {chunk['error']}")
+            if usage is not None and chunk.get("usage"):
+                usage.update(chunk["usage"])
+            choices = chunk.get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if delta:
+                yield delta
+
+
+async def plan_models(model_list: list[str]) -> list[str]:
+    """Fallback chain for this request: reordered by recent health, open circuits skipped."""
+    await breakers.sync(model_list)   # adopt other workers' breaker transitions (multi-worker)
+    if ADAPTIVE_ORDERING:
+        model_list = rank_models(model_list, model_stats)
+    return breakers.admit(model_list)
+
+
+async def _attempt_model(model: str, **kwargs) -> str:
+    """
+    One call_openrouter attempt, gated by the model's circuit breaker, with
+    latency/outcome recorded. Cancellation (a lost hedge race) is not a failure.
+    """
+    breaker = breakers[model]
+    if not breaker.allow():
+        raise CircuitOpenError(f"circuit open for {model}")
+    started = time.perf_counter()
+    usage: dict = {}
+    try:
+        content = await call_openrouter(model=model, usage=usage, **kwargs)
+    except asyncio.CancelledError:
+        breaker.release()
+        _record_attempt(model, "cancelled", time.perf_counter() - started)
+        raise
+    except Exception as e:
+        model_stats[model].record_failure()
+        breaker.record_failure(e)
+        _record_attempt(model, "error", time.perf_counter() - started, e)
+        raise
+    model_stats[model].record_success(time.perf_counter() - started)
+    _record_attempt(model, "ok", time.perf_counter() - started)
+    _record_usage(model, usage)
+    breaker.record_success()
+    return content
+
+
+def _record_attempt(model: str, outcome: str, elapsed: float, exc: BaseException | None = None) -> None:
+    MODEL_ATTEMPTS.inc(model=model, outcome=outcome)
+    MODEL_ATTEMPT_SECONDS.observe(elapsed, model=model, outcome=outcome)
+    if outcome == "cancelled":
+        return
+    if exc is None:
+        status = "200"
+    elif isinstance(exc, httpx.HTTPStatusError):
+        status = str(exc.response.status_code)
+    else:
+        status = type(exc).__name__
+    UPSTREAM_STATUS.inc(model=model, status=status)
+
+
+def _record_usage(model: str, usage: dict) -> None:
+    model_stats[model].record_usage(usage)
+    details = usage.get("prompt_tokens_details") or {}
+    for kind, value in (
+        ("prompt", usage.get("prompt_tokens")),
+        ("completion", usage.get("completion_tokens")),
+        ("cached", details.get("cached_tokens")),
+        ("cache_write", details.get("cache_write_tokens")),
+    ):
+        if value:
+            TOKENS.inc(value, model=model, kind=kind)
+
+
+def hedge_delay(model: str) -> float:
+    """Seconds to wait on `model` before launching the next one: fixed, or its observed p95."""
+    if HEDGE_DELAY != "auto":
+        return float(HEDGE_DELAY)
+    p95 = model_stats[model].latency_p95()
+    return min(HEDGE_DELAY_MAX, max(HEDGE_DELAY_MIN, p95 if p95 is not None else HEDGE_DELAY_DEFAULT))
+
+
 async def call_with_fallback(
     model_list: list[str],
     messages: list[dict],
@@ -161,20 +707,29 @@ async def call_with_fallback(
     Try each model in model_list until one succeeds.
     Returns (content, model_used).
     Raises RuntimeError if all models fail.
+    Models with an open circuit are skipped; with ADAPTIVE_ORDERING the chain is
+    reordered by recent health. Uses the hedged strategy when FALLBACK_STRATEGY=hedged.
     """
+    kwargs = dict(
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        response_format=response_format,
+        timeout=timeout,
+    )
+    model_list = await plan_models(model_list)
+    if FALLBACK_STRATEGY == "hedged":
+        content, model = await _call_hedged(model_list, **kwargs)
+        FALLBACK_DEPTH.observe(model_list.index(model), mode="hedged")
+        return content, model
+
     last_error = None
-    for model in model_list:
+    for depth, model in enumerate(model_list):
         try:
             logger.info(f"Trying model: {model}")
-            content = await call_openrouter(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format=response_format,
-                timeout=timeout,
-            )
+            content = await _attempt_model(model, **kwargs)
             logger.info(f"Success with model: {model}")
+            FALLBACK_DEPTH.observe(depth, mode="sequential")
             return content, model
         except Exception as e:
             logger.warning(f"Model {model} failed: {type(e).__name__}: {e}")
@@ -184,153 +739,352 @@ async def call_with_fallback(
     raise RuntimeError(f"All models failed. Last error: {last_error}")
 
 
-# ─── GitHub context ───────────────────────────────────────────────────────────
-async def fetch_github_context() -> str:
-    """Fetch recent GitHub activity: own repos only (no forks), commits authored by Pranav."""
-    headers = {"Accept": "application/vnd.github+json"}
-    if GITHUB_PAT:
-        headers["Authorization"] = f"Bearer {GITHUB_PAT}"
+async def _call_hedged(model_list: list[str], **kwargs) -> tuple[str, str]:
+    """
+    Hedged fallback: if the newest in-flight model hasn't answered within its hedge
+    delay, launch the next model alongside it (up to HEDGE_MAX_PARALLEL at once).
+    A failure launches the next model immediately. First success wins; the rest are cancelled.
+    """
+    remaining = iter(model_list)
+    pending: dict[asyncio.Task, str] = {}
+    newest = ""
+    exhausted = False
+    last_error = None
 
-    context_parts = []
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            # Own repos only — exclude forks
-            resp = await client.get(
-                f"https://api.github.com/users/{GITHUB_USERNAME}/repos",
-                headers=headers,
-                params={"sort": "updated", "per_page": 30},
-            )
-            if resp.status_code == 200:
-                repos = resp.json()
-                repo_lines = []
-                for r in repos:
-                    if r.get("fork", False):
-                        continue
-                    desc = r.get("description") or ""
-                    lang = r.get("language") or ""
-                    stars = r.get("stargazers_count", 0)
-                    repo_lines.append(f"- {r['name']}: {desc} [{lang}] ⭐{stars}")
-                context_parts.append("GITHUB REPOS (own, non-forked):\n" + "\n".join(repo_lines))
-
-            # Recent push events — only include commits authored by Pranav
-            resp2 = await client.get(
-                f"https://api.github.com/users/{GITHUB_USERNAME}/events/public",
-                headers=headers,
-                params={"per_page": 30},
+    def launch() -> bool:
+        nonlocal newest, exhausted
+        model = next(remaining, None)
+        if model is None:
+            exhausted = True
+            return False
+        logger.info(f"Trying model: {model}" + (" (hedge)" if pending else ""))
+        pending[asyncio.create_task(_attempt_model(model, **kwargs))] = model
+        newest = model
+        return True
+
+    launch()
+    try:
+        while pending:
+            can_hedge = not exhausted and len(pending) < HEDGE_MAX_PARALLEL
+            done, _ = await asyncio.wait(
+                pending, timeout=hedge_delay(newest) if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
             )
-            if resp2.status_code == 200:
-                events = resp2.json()
-                event_lines = []
-                for e in events:
-                    etype = e.get("type", "")
-                    repo_name = e.get("repo", {}).get("name", "")
-                    if etype == "PushEvent":
-                        commits = e.get("payload", {}).get("commits", [])
-                        for c in commits[:2]:
-                            author = c.get("author", {}).get("name", "").lower()
-                            if GITHUB_USERNAME.lower() in author or "pranav" in author or "kowadkar" in author:
-                                msg = c.get("message", "").split("\n")[0][:80]
-                                event_lines.append(f"- Commit to {repo_name}: {msg}")
-                    elif etype == "CreateEvent":
-                        ref_type = e.get("payload", {}).get("ref_type", "")
-                        ref = e.get("payload", {}).get("ref", "")
-                        if ref_type == "repository":
-                            event_lines.append(f"- Created new repo: {repo_name}")
-                        elif ref and ref_type == "branch":
-                            event_lines.append(f"- Created branch '{ref}' in {repo_name}")
-                if event_lines:
-                    context_parts.append("RECENT GITHUB ACTIVITY (Pranav's own commits):\n" + "\n".join(event_lines))
-                else:
-                    context_parts.append("RECENT GITHUB ACTIVITY: No recent public commits found.")
+            if not done:
+                launch()
+                continue
+            for task in done:
+                model = pending.pop(task)
+                if task.exception() is None:
+                    logger.info(f"Success with model: {model}")
+                    return task.result(), model
+                last_error = task.exception()
+                logger.warning(f"Model {model} failed: {type(last_error).__name__}: {last_error}")
+            if len(pending) < HEDGE_MAX_PARALLEL:
+                launch()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise RuntimeError(f"All models failed. Last error: {last_error}")
+
+
+async def stream_with_fallback(
+    model_list: list[str],
+    messages: list[dict],
+    temperature: float = 0.8,
+    max_tokens: int = 8192,
+    timeout: float = 45.0,
+    response_format: dict | None = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """
+    Stream from the first model in model_list that produces a token.
+    Yields (model_used, delta). A model is skipped only if it fails *before* its
+    first token — once output has reached the client, switching models would
+    splice two different answers, so later errors propagate instead.
+    Closing the generator early (the consumer has what it needs) closes the
+    upstream request, so the rest of the completion is never generated.
+    Raises RuntimeError if every model fails before its first token.
+    """
+    last_error = None
+    for depth, model in enumerate(await plan_models(model_list)):
+        breaker = breakers[model]
+        if not breaker.allow():
+            continue
+        logger.info(f"Streaming from model: {model}")
+        usage: dict = {}
+        stream = call_openrouter_stream(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=timeout,
+            usage=usage,
+            response_format=response_format,
+        )
+        started = time.perf_counter()
+        try:
+            first = await asyncio.wait_for(anext(stream), timeout=timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            await stream.aclose()
+            _record_attempt(model, "cancelled", time.perf_counter() - started)
+            raise
+        except Exception as e:
+            await stream.aclose()
+            model_stats[model].record_failure()
+            breaker.record_failure(e)
+            _record_attempt(model, "error", time.perf_counter() - started, e)
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="openrouter_ttft", outcome="error")
+            if isinstance(e, StopAsyncIteration):
+                e = RuntimeError("empty completion")
+            logger.warning(f"Model {model} failed before first token: {type(e).__name__}: {e}")
+            last_error = e
+            continue
 
+        ttft = time.perf_counter() - started
+        STAGE_SECONDS.observe(ttft, stage="openrouter_ttft", outcome="ok")
+        breaker.record_success()
+        FALLBACK_DEPTH.observe(depth, mode="stream")
+        logger.info(f"First token from {model} after {ttft:.2f}s")
+        chars = len(first)   # output tokens ≈ chars / 4 when the provider reports no usage
+        try:
+            yield model, first
+            async for delta in stream:
+                chars += len(delta)
+                yield model, delta
+        except GeneratorExit:
+            # Stopped early by the consumer: the model delivered, the rest wasn't needed
+            model_stats[model].record_stream(ttft, time.perf_counter() - started, max(1, chars // 4))
+            _record_attempt(model, "ok", time.perf_counter() - started)
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="openrouter_stream", outcome="ok")
+            raise
         except Exception as e:
-            logger.warning(f"GitHub fetch failed: {e}")
+            _record_attempt(model, "error", time.perf_counter() - started, e)
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="openrouter_stream", outcome="error")
+            raise
+        finally:
+            await stream.aclose()
+        output_tokens = usage.get("completion_tokens") or max(1, chars // 4)
+        model_stats[model].record_stream(ttft, time.perf_counter() - started, output_tokens)
+        _record_attempt(model, "ok", time.perf_counter() - started)
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="openrouter_stream", outcome="ok")
+        _record_usage(model, usage)
+        return
+
+    raise RuntimeError(f"All models failed. Last error: {last_error}")
 
-    return "\n\n".join(context_parts)
+
+# ─── GitHub context ───────────────────────────────────────────────────────────
+github_cache = GitHubContextCache(
+    github_pool,
+    api_base=GITHUB_API_BASE,
+    username=GITHUB_USERNAME,
+    pat=GITHUB_PAT,
+    ttl=GITHUB_CACHE_TTL,
+    shared=shared_state,
+)
+
+
+async def fetch_github_context() -> str:
+    """Recent GitHub activity (own repos, Pranav's commits) — served from the SWR cache."""
+    return await github_cache.get()
 
 
 # ─── Haiku generation ─────────────────────────────────────────────────────────
-async def generate_haikus(context: str) -> list[dict]:
-    """Generate 10 haikus via OpenRouter fallback chain."""
+@timed("generate_haikus")
+async def generate_haikus(context: str, count: int = HAIKU_BATCH_SIZE, focus: str = "", avoid: list[str] = ()) -> list[dict]:
+    """
+    Generate a small batch of haikus via the OpenRouter fallback chain.
+    The completion is parsed incrementally (haiku_stream.py): each haiku is validated
+    (schema, 3 lines, 5-7-5) as it arrives, and with HAIKU_STREAM the stream is closed
+    once `count` valid ones are in. Returns the valid haikus — salvaged ones too if the
+    output breaks off — and raises only if every model fails or none were usable.
+    """
     if not OPENROUTER_API_KEY:
-        logger.warning("OPENROUTER_API_KEY not set — using fallback haikus")
-        return random.sample(FALLBACK_HAIKUS, len(FALLBACK_HAIKUS))
+        raise RuntimeError("OPENROUTER_API_KEY not set")
+
+    # Ask for a few spares so items rejected by validation don't leave the batch short
+    ask = count + HAIKU_SPARE
+    avoid_block = ""
+    if avoid:
+        avoid_block = "\nALREADY COVERED — do not reuse these facts:\n" + "\n".join(f"- {fact}" for fact in avoid) + "\n"
 
     prompt = f"""You are generating hidden easter egg haikus for Pranav Kowadkar's portfolio website.
 Each haiku encodes a real, specific, surprising fun fact about Pranav's life — drawn from the sources below.
 
 SOURCES:
 {context}
-
+{avoid_block}
 RULES:
-1. Generate exactly 10 haikus. Each must be 5-7-5 syllables (strict).
+1. Generate exactly {ask} haikus. Each must be 5-7-5 syllables (strict).
 2. Each haiku must encode ONE specific, real, verifiable fact from the sources above.
 3. Prioritize surprising, personal, human facts — NOT generic tech facts.
-4. Vary the sources: at least 4 from the journey doc, 2 from the resume, 2 from GitHub activity, 2 wildcard.
+4. Draw these haikus from {focus or "any of the sources"}.
 5. Each haiku must have a unique emoji that matches its theme.
 6. The "fact" field must be a single sentence stating the actual fact the haiku encodes.
 7. The "id" must be a short lowercase slug (e.g. "planes", "scuba", "sentinel").
 
-Return ONLY valid JSON — an array of 10 objects with this exact schema:
-[
+Return ONLY valid JSON — an object with a "haikus" array of {ask} objects with this exact schema:
+{{"haikus": [
   {{
     "id": "slug",
     "lines": ["line1 (5 syllables)", "line2 (7 syllables)", "line3 (5 syllables)"],
     "fact": "The real fun fact this haiku encodes.",
     "emoji": "🎋"
   }}
-]
+]}}
 
-No markdown, no explanation, no code blocks — raw JSON array only."""
+No markdown, no explanation, no code blocks — raw JSON only."""
 
     messages = [{"role": "user", "content": prompt}]
+    collector = HaikuCollector(want=count, syllable_tolerance=HAIKU_SYLLABLE_TOLERANCE)
+    kwargs = dict(
+        model_list=HAIKU_MODELS,
+        messages=messages,
+        temperature=0.9,
+        max_tokens=400 + 200 * ask,
+        response_format={"type": "json_object"},
+        timeout=HAIKU_CALL_TIMEOUT,
+    )
+
+    model_used = "?"
+    parse_seconds = 0.0   # haiku_json_parse: parser time summed over the batch's chunks
+    if HAIKU_STREAM:
+        try:
+            async with aclosing(stream_with_fallback(**kwargs)) as stream:
+                async for model_used, delta in stream:
+                    t0 = time.perf_counter()
+                    done = collector.feed(delta)
+                    parse_seconds += time.perf_counter() - t0
+                    if done:
+                        break   # enough valid haikus — closing the stream stops generation
+        except Exception as e:
+            if not collector.accepted:
+                raise
+            logger.warning(f"Haiku stream from {model_used} broke off ({e}); keeping {len(collector.accepted)} salvaged")
+    else:
+        raw, model_used = await call_with_fallback(**kwargs)
+        t0 = time.perf_counter()
+        collector.feed(raw)
+        parse_seconds = time.perf_counter() - t0
+
+    stats = collector.stats()
+    STAGE_SECONDS.observe(parse_seconds, stage="haiku_json_parse", outcome="ok" if collector.accepted else "error")
+    for verdict, n in stats.items():
+        if n:
+            HAIKU_ITEMS.inc(n, verdict=verdict)
+    early = " (stopped early)" if HAIKU_STREAM and collector.done else ""
+    logger.info(f"Haiku batch by {model_used}: {stats}{early}")
+    if not collector.accepted:
+        raise RuntimeError(f"no valid haikus in output from {model_used}: {stats}")
+    return collector.accepted
+
+
+# ─── Startup warm-up ──────────────────────────────────────────────────────────
+# After a Render free-tier wake the first visitor would otherwise pay for cold
+# connections, a GitHub fetch and prompt assembly on top of the process start.
+# The warm-up does that work right after startup, concurrently, in the background;
+# readiness flips once it has finished (or WARMUP_TIMEOUT passed). Liveness never waits.
+startup: dict = {"imported_at": time.time(), "lifespan_at": 0.0, "ready_at": 0.0, "draining_at": 0.0, "steps": {}}
+_warmup_task: asyncio.Task | None = None
+
+
+async def _warm_step(name: str, coro) -> None:
+    started = time.perf_counter()
+    try:
+        ok = await coro
+        outcome = "ok" if ok is not False else "failed"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        outcome = "failed"
+        logger.warning(f"Warm-up step {name} failed: {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.observe(elapsed, stage=f"warmup_{name}", outcome="ok" if outcome == "ok" else "error")
+    startup["steps"][name] = {"outcome": outcome, "seconds": round(elapsed, 3)}
 
+
+async def _warm_prompts() -> bool:
+    """
+    GitHub context first (connection + fetch), then pre-assemble the haiku prompt with it
+    (chat prompts are split per request). The cache logs and swallows fetch errors, so
+    success is judged by its error counter and by having any context at all.
+    """
+    errors = github_cache.counters["errors"]
+    github = await fetch_github_context()
+    context_store.build("haiku", github)
+    return bool(github) and github_cache.counters["errors"] == errors
+
+
+async def warm_up() -> None:
+    steps = [_warm_step("github_context", _warm_prompts())]
+    if OPENROUTER_API_KEY:
+        steps.append(_warm_step("openrouter_connect", openrouter_pool.warm()))
     try:
-        raw, model_used = await call_with_fallback(
-            model_list=HAIKU_MODELS,
-            messages=messages,
-            temperature=0.9,
-            max_tokens=2048,
-            response_format={"type": "json_object"},
-            timeout=30.0,
-        )
-        logger.info(f"Haikus generated by: {model_used}")
-
-        # Some models wrap the array in an object — handle both cases
-        parsed = json.loads(raw)
-        if isinstance(parsed, list):
-            haikus = parsed
-        elif isinstance(parsed, dict):
-            # Try common wrapper keys
-            for key in ("haikus", "result", "data", "items"):
-                if key in parsed and isinstance(parsed[key], list):
-                    haikus = parsed[key]
-                    break
-            else:
-                # Last resort: grab the first list value
-                haikus = next((v for v in parsed.values() if isinstance(v, list)), [])
-        else:
-            haikus = []
+        await asyncio.wait_for(asyncio.gather(*steps), timeout=WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up still running after {WARMUP_TIMEOUT:.0f}s — marking ready anyway")
+    startup["ready_at"] = time.time()
+    logger.info(
+        f"Ready {startup['ready_at'] - startup['lifespan_at']:.2f}s after startup "
+        f"({startup['lifespan_at'] - startup['imported_at']:.2f}s imports → lifespan): {startup['steps']}"
+    )
+
+
+def start_warmup() -> None:
+    global _warmup_task
+    if not WARMUP_ENABLED:
+        startup["ready_at"] = time.time()
+        return
+    _warmup_task = asyncio.create_task(warm_up())
+
+
+async def stop_warmup() -> None:
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+
+
+def mark_draining() -> None:
+    if not startup["draining_at"]:
+        startup["draining_at"] = time.time()
+        logger.info(f"Draining: {llm_limiter.in_flight} LLM call(s) in flight, no longer ready")
 
-    except Exception as e:
-        logger.error(f"Haiku generation failed across all models: {e}")
-        return random.sample(FALLBACK_HAIKUS, len(FALLBACK_HAIKUS))
 
-    # Validate structure
-    validated = []
-    for h in haikus:
-        if (
-            isinstance(h, dict)
-            and "id" in h and "lines" in h and "fact" in h and "emoji" in h
-            and isinstance(h["lines"], list) and len(h["lines"]) == 3
-        ):
-            validated.append(h)
+def install_drain_handler() -> None:
+    """
+    Flip readiness to 503 the moment SIGTERM/SIGINT arrives, so load balancers stop routing
+    here while the server finishes in-flight requests. Chains to the server's own handler.
+    """
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
 
-    if len(validated) < 5:
-        logger.warning(f"Only {len(validated)} valid haikus — supplementing with fallbacks")
-        validated += random.sample(FALLBACK_HAIKUS, 10 - len(validated))
+        def handler(signum, frame, previous=previous):
+            mark_draining()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
 
-    return validated[:10]
+        try:
+            signal.signal(sig, handler)
+        except ValueError:
+            return  # not the main thread (e.g. TestClient) — nothing to hook
+
+
+def readiness() -> dict:
+    ready_at = startup["ready_at"]
+    return {
+        "ready": bool(ready_at) and not startup["draining_at"],
+        "draining": bool(startup["draining_at"]),
+        "uptime_s": round(time.time() - startup["imported_at"], 3),
+        "warmup_s": round(ready_at - startup["lifespan_at"], 3) if ready_at else None,
+        "steps": startup["steps"],
+    }
 
 
 # ─── Routes ───────────────────────────────────────────────────────────────────
@@ -341,63 +1095,269 @@ async def root():
 
 @app.api_route("/api/health", methods=["GET", "HEAD"])
 async def health():
-    """UptimeRobot pings this every 5 min to prevent Render free tier sleep."""
-    return {"status": "alive", "timestamp": datetime.utcnow().isoformat()}
+    """
+    UptimeRobot pings this every 5 min to prevent Render free tier sleep.
+    Liveness: always 200 once the process serves requests; `ready` says whether warm-up is done.
+    """
+    return {"status": "alive", "ready": readiness()["ready"], "timestamp": datetime.utcnow().isoformat()}
+
+
+@app.api_route("/api/health/ready", methods=["GET", "HEAD"])
+async def health_ready():
+    """Readiness probe (Render health check): 503 until the startup warm-up has finished, and while draining."""
+    state = readiness()
+    if not state["ready"]:
+        status = "draining" if state["draining"] else "warming"
+        return JSONResponse({"status": status, **state}, status_code=503)
+    return {"status": "ready", **state}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: route latency, per-stage timings, model attempts, tokens."""
+    return Response(METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/diagnostics")
+async def diagnostics():
+    """Internal runtime state — connection pools, caches, per-model stats and circuit breakers."""
+    return {
+        "pools": {
+            "openrouter": openrouter_pool.stats(),
+            "github": github_pool.stats(),
+        },
+        "github_cache": github_cache.stats(),
+        "outbox": await contact_outbox.stats(),
+        "chat_cache": response_cache.stats(),
+        "haiku_pool": {**haiku_pool.stats(), "target": HAIKU_POOL_TARGET},
+        "startup": readiness(),
+        "admission": {
+            "llm": llm_limiter.stats(),
+            # Shared limiters count rows in SQLite: off the loop
+            "chat_rate": await asyncio.to_thread(chat_limiter.stats),
+            "haiku_refresh_rate": await asyncio.to_thread(haiku_refresh_limiter.stats),
+        },
+        "models": model_stats.snapshot(),
+        "breakers": breakers.snapshot(),
+        # Scheme only: the URL may carry credentials (redis://:password@host)
+        "shared_state": {
+            "backend": SHARED_STATE_URL.split("://", 1)[0] if SHARED_STATE_URL else None,
+            "pid": os.getpid(),
+            "breaker_sync": breakers.stats(),
+        },
+        "chains": {
+            "chat": rank_models(CHAT_MODELS, model_stats) if ADAPTIVE_ORDERING else CHAT_MODELS,
+            "haiku": rank_models(HAIKU_MODELS, model_stats) if ADAPTIVE_ORDERING else HAIKU_MODELS,
+        },
+    }
+
+
+async def load_persisted_haikus() -> bool:
+    """Adopt the shared persisted pool if it's newer than ours (another worker / previous run)."""
+    raw = await asyncio.to_thread(haiku_store.get, HAIKU_POOL_KEY)
+    return haiku_pool.adopt(raw)
+
+
+def haiku_pool_due() -> bool:
+    """Below target, or nothing new for HAIKU_CACHE_TTL (so fresh GitHub facts keep flowing in)."""
+    return len(haiku_pool) < HAIKU_POOL_TARGET or time.time() - haiku_pool.newest_at() >= HAIKU_CACHE_TTL
+
+
+async def save_haikus(haikus: list[dict]) -> int:
+    """Merge `haikus` into the stored pool (read-merge-write under the store's lock), then adopt it."""
+    merged = {}
+
+    def merge(raw: str | None) -> str:
+        doc, merged["added"] = haiku_pool.merged(raw, haikus)
+        return doc
+
+    doc = await asyncio.to_thread(update, haiku_store, HAIKU_POOL_KEY, merge)
+    haiku_pool.adopt(doc)
+    return merged["added"]
+
+
+async def _haiku_batch(context: str, focus: str, avoid: list[str]) -> list[dict]:
+    async with llm_limiter.slot():
+        return await generate_haikus(context, count=HAIKU_BATCH_SIZE, focus=focus, avoid=avoid)
+
+
+async def _replenish_haikus() -> int:
+    """One round: HAIKU_BATCH_CONCURRENCY small batches in parallel, merged into the shared pool."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+    locked = await asyncio.to_thread(haiku_store.set, HAIKU_LOCK_KEY, owner, ex=math.ceil(HAIKU_LOCK_TTL), nx=True)
+    if not locked:
+        # Another worker is on it; its additions are adopted on our next check
+        logger.info("Haiku pool is being replenished elsewhere — skipping this round")
+        return 0
+
+    try:
+        await load_persisted_haikus()   # build on the latest shared pool, not a stale copy
+        haiku_pool.expire()
+        github = await fetch_github_context()
+        with timed("prompt_build"):
+            context = context_store.build("haiku", github)
+        avoid = haiku_pool.avoid_list()
+        offset = random.randrange(len(HAIKU_FOCUSES))
+        results = await asyncio.gather(
+            *(
+                _haiku_batch(context, HAIKU_FOCUSES[(offset + i) % len(HAIKU_FOCUSES)], avoid)
+                for i in range(HAIKU_BATCH_CONCURRENCY)
+            ),
+            return_exceptions=True,
+        )
+        fresh = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Haiku batch failed: {type(result).__name__}: {result}")
+            else:
+                fresh += result
+        added = await save_haikus(fresh) if fresh else 0
+        if all(isinstance(r, Exception) for r in results):
+            raise RuntimeError(f"every haiku batch failed: {results[0]}")
+        logger.info(f"Haiku pool +{added} → {len(haiku_pool)} haikus")
+        return added
+    finally:
+        # Only our own lock: if the round outlived the TTL, another worker may hold it now
+        await asyncio.to_thread(delete_if, haiku_store, HAIKU_LOCK_KEY, owner)
+
+
+def _log_regen_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Haiku generation failed: {task.exception()}")
+
+
+def replenish_haikus() -> asyncio.Task:
+    """Single-flight: start a replenish round unless one is running; every caller shares the same task."""
+    global _haiku_fill_task
+    if _haiku_fill_task is None or _haiku_fill_task.done():
+        _haiku_fill_task = asyncio.create_task(_replenish_haikus())
+        _haiku_fill_task.add_done_callback(_log_regen_failure)
+    return _haiku_fill_task
+
+
+async def _replenish_loop() -> None:
+    """Keep the pool topped up: back-to-back rounds while a round adds haikus and the pool is short."""
+    while True:
+        delay = HAIKU_POOL_CHECK_INTERVAL
+        try:
+            await load_persisted_haikus()
+            if haiku_pool.expire():
+                await save_haikus([])   # expire in the stored pool too
+            if OPENROUTER_API_KEY and not startup["draining_at"] and haiku_pool_due():
+                added = await asyncio.shield(replenish_haikus())
+                if added and len(haiku_pool) < HAIKU_POOL_TARGET:
+                    delay = 1.0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Haiku replenish round failed: {e}")
+        await asyncio.sleep(delay)
+
+
+def start_haiku_replenisher() -> None:
+    global _haiku_replenisher
+    if _haiku_replenisher is None:
+        if not OPENROUTER_API_KEY:
+            logger.warning("OPENROUTER_API_KEY not set — serving fallback haikus")
+        _haiku_replenisher = asyncio.create_task(_replenish_loop())
+
+
+async def stop_haiku_replenisher() -> None:
+    global _haiku_replenisher
+    for task in (_haiku_replenisher, _haiku_fill_task):
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+    _haiku_replenisher = None
+
+
+def _authorize_refresh(token: str | None) -> None:
+    """?refresh=true costs a full LLM round — require the token, or rate-limit it if none is set."""
+    global _last_forced_refresh
+    if HAIKU_REFRESH_TOKEN:
+        if not token or not hmac.compare_digest(token, HAIKU_REFRESH_TOKEN):
+            raise HTTPException(status_code=403, detail="Haiku refresh requires a valid X-Refresh-Token header.")
+        return
+    wait = _last_forced_refresh + HAIKU_REFRESH_MIN_INTERVAL - time.time()
+    if wait > 0 and not (_haiku_fill_task and not _haiku_fill_task.done()):
+        raise HTTPException(
+            status_code=429,
+            detail="Haikus were refreshed recently — try again later.",
+            headers={"Retry-After": str(int(wait) + 1)},
+        )
+    _last_forced_refresh = time.time()
 
 
 @app.get("/api/haiku")
-async def get_haikus(refresh: bool = False):
+async def get_haikus(
+    request: Request, refresh: bool = False, x_refresh_token: str | None = Header(default=None)
+):
     """
-    Returns 10 dynamically generated haikus about Pranav.
-    Generated via OpenRouter RAG over journey doc, resume, and GitHub activity.
-    Cached for 24 hours (HAIKU_CACHE_TTL env var). Pass ?refresh=true to force regeneration.
+    Returns 10 haikus about Pranav, drawn at random from a persistent pool.
+    The pool is generated via OpenRouter RAG over journey doc, resume, and GitHub activity,
+    shared by all workers and restarts (HAIKU_CACHE_URL), and replenished in the background
+    in small batches — responses never wait on an LLM. Until the pool holds 10 haikus, the
+    hardcoded set fills the gap. Pass ?refresh=true to add a fresh round now (needs
+    X-Refresh-Token when HAIKU_REFRESH_TOKEN is set, otherwise limited to once per
+    HAIKU_REFRESH_MIN_INTERVAL).
     """
-    now = time.time()
-    cache_age = now - _haiku_cache["generated_at"]
-    cache_valid = _haiku_cache["haikus"] and cache_age < HAIKU_CACHE_TTL and not refresh
+    if refresh:
+        try:
+            await haiku_refresh_limiter.acheck(client_key(request))
+        except Rejected as e:
+            raise rejection(e)
+        _authorize_refresh(x_refresh_token)
+        try:
+            # shield: a client hanging up mustn't cancel the round other callers share
+            await asyncio.shield(replenish_haikus())
+        except Exception as e:
+            logger.error(f"Haiku refresh failed: {e}")
+    elif OPENROUTER_API_KEY and len(haiku_pool) < HAIKUS_PER_RESPONSE:
+        replenish_haikus()   # cold pool: start filling now rather than at the next check
+
+    haikus = haiku_pool.sample(HAIKUS_PER_RESPONSE)
+    fallback = len(haikus) < HAIKUS_PER_RESPONSE
+    if fallback:
+        taken = {h["id"] for h in haikus}
+        spare = [h for h in FALLBACK_HAIKUS if h["id"] not in taken]
+        haikus += random.sample(spare, min(len(spare), HAIKUS_PER_RESPONSE - len(haikus)))
+    newest = haiku_pool.newest_at()
+    response = {
+        "haikus": haikus,
+        "cached": not refresh,
+        "pool_size": len(haiku_pool),
+        "generated_at": datetime.utcfromtimestamp(newest or time.time()).isoformat(),
+    }
+    if fallback:
+        response["fallback"] = True
+    return response
 
-    if cache_valid:
-        logger.info(f"Serving cached haikus (age: {int(cache_age)}s)")
-        return {
-            "haikus": _haiku_cache["haikus"],
-            "cached": True,
-            "generated_at": datetime.utcfromtimestamp(_haiku_cache["generated_at"]).isoformat(),
-        }
 
-    logger.info("Generating fresh haikus via OpenRouter RAG...")
+# ─── Pai Chat endpoint ────────────────────────────────────────────────────────
+# Chat response cache (exact + near-duplicate), invalidated by data/GitHub changes
+response_cache = ResponseCache(
+    max_entries=CHAT_CACHE_SIZE,
+    ttl=CHAT_CACHE_TTL,
+    semantic=CHAT_CACHE_SEMANTIC,
+    semantic_threshold=CHAT_CACHE_SEMANTIC_THRESHOLD,
+    shared=shared_state,
+)
 
-    journey = load_text("journey.txt")
-    resume  = load_text("resume.txt")
-    github  = await fetch_github_context()
 
-    context = "\n\n".join(filter(None, [
-        f"=== JOURNEY DOCUMENT ===\n{journey[:20000]}",
-        f"=== MASTER RESUME ===\n{resume[:8000]}",
-        f"=== GITHUB CONTEXT ===\n{github[:4000]}",
-    ]))
+_DETAIL_RE = re.compile(
+    r"\b(explain|in detail|detailed|walk me through|step by step|everything|all of|compare|elaborate|deep dive)\b",
+    re.IGNORECASE,
+)
 
-    try:
-        haikus = await generate_haikus(context)
-        _haiku_cache["haikus"] = haikus
-        _haiku_cache["generated_at"] = now
-        logger.info(f"Generated {len(haikus)} haikus successfully")
-        return {
-            "haikus": haikus,
-            "cached": False,
-            "generated_at": datetime.utcnow().isoformat(),
-        }
-    except Exception as e:
-        logger.error(f"Haiku generation failed: {e}")
-        shuffled = random.sample(FALLBACK_HAIKUS, len(FALLBACK_HAIKUS))
-        return {
-            "haikus": shuffled,
-            "cached": False,
-            "generated_at": datetime.utcnow().isoformat(),
-            "fallback": True,
-        }
+
+def answer_max_tokens(question: str) -> int:
+    """Pai answers in 2-4 sentences or a short paragraph; allow more when detail is asked for."""
+    return CHAT_MAX_TOKENS_LONG if _DETAIL_RE.search(question) else CHAT_MAX_TOKENS
 
 
-# ─── Pai Chat endpoint ────────────────────────────────────────────────────────
 class ChatMessage(BaseModel):
     role: str  # "user" or "model"
     content: str
@@ -405,74 +1365,165 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     history: list[ChatMessage] = []
+    stream: bool = False  # true → text/event-stream of deltas instead of one JSON reply
 
-PAI_SYSTEM_PROMPT = """🎬 You are Pai — Pranav Kowadkar's AI Guide, embedded in his portfolio.
-You are a vivid, articulate narrator of his professional journey. Speak with cinematic clarity,
-grounded confidence, and human warmth. You are NOT Pranav himself — you are his assistant,
-always speaking in third person about Pranav.
 
-IDENTITY: If addressed as "Pranav" or asked if you ARE Pranav, respond:
-"I'm Pai — Pranav's AI Guide. Let's explore his journey together."
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-Always speak in third person. Never impersonate Pranav. Never say "I" when referring to
-Pranav's experiences. Never robotic. Never start responses with "Certainly!" or "Great question!"
-— just answer naturally. Keep responses conversational and complete — never cut off mid-sentence.
-Avoid bullet lists; write in flowing prose. Aim for 2-4 sentences for simple questions, a short
-paragraph for complex ones. Occasionally drop a fun fact about Pranav's past when it's relevant.
 
-CRITICAL RULES:
-- ALWAYS speak in third person. Say "Pranav built" not "I built".
-- Do NOT discuss technical implementation details of Project Poltergeist beyond its multi-agent architecture.
-- If asked something off-topic: "We're drifting off-track — let's get back to Pranav's journey."
-- If asked about visa/sponsorship: "Pranav will require future work authorization sponsorship. For specifics, contact him directly."
-- If someone asks to contact Pranav, direct them to pk.kowadkar@gmail.com or LinkedIn (linkedin.com/in/pkowadkar).
-- If you don't know something specific, say "I'm not sure about that one — reach out to Pranav directly."
+async def _chat_event_stream(
+    first: tuple[str, str],
+    rest: AsyncIterator[tuple[str, str]],
+    on_complete: Callable[[str, str], None] | None = None,
+) -> AsyncIterator[str]:
+    model_used, delta = first
+    parts = [delta]
+    yield _sse({"model": model_used}, event="start")
+    yield _sse({"delta": delta})
+    try:
+        async for _, delta in rest:
+            parts.append(delta)
+            yield _sse({"delta": delta})
+    except Exception as e:
+        logger.error(f"Chat stream from {model_used} broke mid-answer: {e}")
+        yield _sse({"detail": "Pai lost the connection mid-answer — try again shortly."}, event="error")
+        return
+    finally:
+        # Client disconnects close this generator; release the upstream stream with it
+        await rest.aclose()
+    if on_complete:
+        on_complete("".join(parts), model_used)
+    yield _sse({"model": model_used}, event="done")
+
+
+async def _releasing(ticket: int, events: AsyncIterator[tuple[str, str]]) -> AsyncIterator[tuple[str, str]]:
+    """Hold an LLM slot for as long as the stream runs (finished, failed or client gone)."""
+    try:
+        async for item in events:
+            yield item
+    finally:
+        await events.aclose()
+        llm_limiter.release(ticket)
 
-EASTER EGGS:
-- Hidden haiku poems are scattered throughout the portfolio. Trigger: Konami code (↑↑↓↓←→←→BA).
-- If asked about easter eggs or haikus, confirm they exist and hint at the Konami code."""
+
+async def _cached_event_stream(reply: str, model_used: str, tier: str) -> AsyncIterator[str]:
+    yield _sse({"model": model_used, "cached": tier}, event="start")
+    yield _sse({"delta": reply})
+    yield _sse({"model": model_used, "cached": tier}, event="done")
 
 
 @app.post("/api/chat")
-async def chat(req: ChatRequest):
+async def chat(req: ChatRequest, request: Request):
     """
     Pai — Pranav's AI Guide.
     Does live RAG over journey doc, master resume, and GitHub activity.
     Uses OpenRouter multi-model fallback chain for conversational responses.
+    Repeat (and, for opening questions, paraphrased) questions are answered from the
+    response cache; such replies carry `"cached": "exact" | "semantic"`.
+    With `stream: true` the reply is sent as Server-Sent Events:
+      event: start {"model"} → data {"delta"}… → event: done {"model"} (or event: error {"detail"})
     """
     if not OPENROUTER_API_KEY:
         raise HTTPException(status_code=503, detail="AI service not configured")
 
-    # Build live context from all sources
-    journey = load_text("journey.txt")
-    resume  = load_text("resume.txt")
-    github  = await fetch_github_context()
-
-    context = "\n\n".join(filter(None, [
-        f"=== PRANAV'S JOURNEY (complete) ===\n{journey[:25000]}",
-        f"=== MASTER RESUME ===\n{resume[:8000]}",
-        f"=== GITHUB ACTIVITY (live) ===\n{github[:4000]}",
-    ]))
+    try:
+        await chat_limiter.acheck(client_key(request))
+    except Rejected as e:
+        raise rejection(e)
+
+    github = await fetch_github_context()
+    history = [("assistant" if m.role == "model" else m.role, m.content) for m in req.history[-CHAT_HISTORY_MAX_TURNS:]]
+
+    # Same question + same recent history + same data/GitHub version → same answer
+    context_version = f"{context_store.version}:{hashlib.sha1(github.encode()).hexdigest()[:12]}"
+    history_fp = history_fingerprint(history)
+    if CHAT_CACHE_ENABLED:
+        hit = await response_cache.get(req.message, history_fp, context_version, allow_semantic=not history)
+        if hit:
+            entry, tier = hit
+            logger.info(f"Chat response from cache ({tier})")
+            if req.stream:
+                return StreamingResponse(
+                    _cached_event_stream(entry.reply, entry.model, tier),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                )
+            return {"reply": entry.reply, "model": entry.model, "cached": tier}
+
+    with timed("prompt_build"):
+        # Stable prefix (persona + whole documents, or just the persona in retrieval mode)
+        # first so provider prompt caches hit; per-request excerpts and GitHub after it
+        stable, volatile = context_store.split(
+            "chat", github,
+            query=req.message if RAG_MODE == "retrieval" else None,
+            k=RAG_TOP_K, token_budget=RAG_TOKEN_BUDGET,
+        )
 
-    system_with_context = f"{PAI_SYSTEM_PROMPT}\n\n{context}"
+        # Newest turns verbatim within the token budget; older ones as a short recap
+        packed, earlier = pack_history(history, CHAT_HISTORY_TOKEN_BUDGET)
+        if earlier:
+            volatile += f"\n\n=== EARLIER IN THIS CONVERSATION ===\n{earlier}"
+
+        # Build OpenAI-compatible message list (system + history + new message)
+        # Convert "model" role (Gemini convention) → "assistant" (OpenAI convention)
+        messages: list[dict] = [_system_message(stable, volatile)]
+        for role, content in packed:
+            messages.append({"role": role, "content": content})
+        messages.append({"role": "user", "content": req.message})
+
+    started = time.perf_counter()
+
+    def remember(reply: str, model_used: str) -> None:
+        if CHAT_CACHE_ENABLED and reply:
+            tokens = sum(count_tokens(_message_text(m)) for m in messages) + count_tokens(reply)
+            response_cache.put(
+                req.message, history_fp, context_version, reply, model_used,
+                tokens=tokens, latency=time.perf_counter() - started, semantic=not history,
+            )
 
-    # Build OpenAI-compatible message list (system + history + new message)
-    # Convert "model" role (Gemini convention) → "assistant" (OpenAI convention)
-    messages: list[dict] = [{"role": "system", "content": system_with_context}]
-    for m in req.history[-10:]:
-        role = "assistant" if m.role == "model" else m.role
-        messages.append({"role": role, "content": m.content})
-    messages.append({"role": "user", "content": req.message})
+    # Cache misses need an upstream slot; past the queue bound, shed fast with a 503
+    try:
+        ticket = await llm_limiter.acquire()
+    except Rejected as e:
+        logger.warning(f"Chat shed: {e.reason}")
+        raise rejection(e)
+
+    if req.stream:
+        # Pull the first token before committing to a 200 so a total outage is still a clean 500
+        events = _releasing(ticket, stream_with_fallback(
+            model_list=CHAT_MODELS,
+            messages=messages,
+            temperature=0.8,
+            max_tokens=answer_max_tokens(req.message),
+            timeout=45.0,
+        ))
+        try:
+            first = await anext(events)
+        except Exception as e:
+            logger.error(f"Chat stream error across all models: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail="Pai is having trouble connecting. All models are currently unavailable — try again shortly."
+            )
+        logger.info(f"Chat streaming from: {first[0]}")
+        return StreamingResponse(
+            _chat_event_stream(first, events, on_complete=remember),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     try:
         reply, model_used = await call_with_fallback(
             model_list=CHAT_MODELS,
             messages=messages,
             temperature=0.8,
-            max_tokens=8192,
+            max_tokens=answer_max_tokens(req.message),
             timeout=45.0,
         )
         logger.info(f"Chat response from: {model_used}")
+        remember(reply, model_used)
         return {"reply": reply, "model": model_used}
     except Exception as e:
         logger.error(f"Chat error across all models: {e}")
@@ -480,9 +1531,21 @@ async def chat(req: ChatRequest):
             status_code=500,
             detail="Pai is having trouble connecting. All models are currently unavailable — try again shortly."
         )
+    finally:
+        llm_limiter.release(ticket)
 
 
 # ─── Contact endpoint ─────────────────────────────────────────────────────────
+# Submissions are journaled to disk before they're acknowledged, then delivered in the
+# background over one reused SMTP session (see outbox.py)
+contact_outbox = ContactOutbox(
+    SMTPSession(SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS),
+    OutboxJournal(STATE_DIR / "outbox.db"),
+    batch_size=SMTP_BATCH_SIZE,
+    max_attempts=SMTP_MAX_ATTEMPTS,
+    retention=OUTBOX_RETENTION,
+)
+
 class ContactMessage(BaseModel):
     name: str
     email: str
@@ -490,51 +1553,66 @@ class ContactMessage(BaseModel):
     message: str
 
 
+def render_contact_email(msg: ContactMessage) -> str:
+    """Build the full MIME message (as a string) for a contact submission."""
+    mime = MIMEMultipart("alternative")
+    mime["Subject"] = f"[pk-portfolio] {msg.subject}"
+    mime["From"]    = SMTP_USER
+    mime["To"]      = RECIPIENT_EMAIL
+    mime["Reply-To"] = msg.email
+
+    html_body = f"""
+    <html><body style="font-family:-apple-system,sans-serif;color:#1c1c1e;max-width:600px;">
+      <div style="background:#0a0a0a;padding:20px;border-radius:12px;margin-bottom:20px;">
+        <span style="color:#e50914;font-size:18px;font-weight:bold;">pk-portfolio</span>
+        <span style="color:rgba(255,255,255,0.4);font-size:12px;margin-left:8px;">new message</span>
+      </div>
+      <table style="width:100%;border-collapse:collapse;">
+        <tr><td style="padding:8px 0;color:#666;width:100px;">From</td>
+            <td style="padding:8px 0;font-weight:600;">{msg.name}</td></tr>
+        <tr><td style="padding:8px 0;color:#666;">Email</td>
+            <td style="padding:8px 0;"><a href="mailto:{msg.email}">{msg.email}</a></td></tr>
+        <tr><td style="padding:8px 0;color:#666;">Subject</td>
+            <td style="padding:8px 0;">{msg.subject}</td></tr>
+      </table>
+      <hr style="border:none;border-top:1px solid #eee;margin:16px 0;"/>
+      <div style="white-space:pre-wrap;line-height:1.6;">{msg.message}</div>
+      <hr style="border:none;border-top:1px solid #eee;margin:16px 0;"/>
+      <p style="color:#999;font-size:12px;">Sent via pk-portfolio · {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}</p>
+    </body></html>"""
+
+    mime.attach(MIMEText(html_body, "html"))
+    return mime.as_string()
+
+
 @app.post("/api/contact")
+@timed("contact")
 async def contact(msg: ContactMessage):
-    """Receives contact form submissions and forwards via Gmail SMTP."""
+    """
+    Receives contact form submissions and queues them for Gmail SMTP delivery.
+    Returns once the message is committed to the on-disk outbox journal; the outbox
+    worker sends it in the background (and after a restart, if need be).
+    """
     if not SMTP_USER or not SMTP_PASS:
         logger.warning("SMTP not configured — logging message only")
         logger.info(f"Contact from {msg.name} <{msg.email}>: {msg.subject}")
         return {"success": True, "message": "Message received (SMTP not configured)"}
 
+    # Same sender + same content = same submission (double-clicks, client retries)
+    key = hashlib.sha256(
+        json.dumps([msg.name, msg.email, msg.subject, msg.message], ensure_ascii=False).encode()
+    ).hexdigest()
     try:
-        mime = MIMEMultipart("alternative")
-        mime["Subject"] = f"[pk-portfolio] {msg.subject}"
-        mime["From"]    = SMTP_USER
-        mime["To"]      = RECIPIENT_EMAIL
-        mime["Reply-To"] = msg.email
-
-        html_body = f"""
-        <html><body style="font-family:-apple-system,sans-serif;color:#1c1c1e;max-width:600px;">
-          <div style="background:#0a0a0a;padding:20px;border-radius:12px;margin-bottom:20px;">
-            <span style="color:#e50914;font-size:18px;font-weight:bold;">pk-portfolio</span>
-            <span style="color:rgba(255,255,255,0.4);font-size:12px;margin-left:8px;">new message</span>
-          </div>
-          <table style="width:100%;border-collapse:collapse;">
-            <tr><td style="padding:8px 0;color:#666;width:100px;">From</td>
-                <td style="padding:8px 0;font-weight:600;">{msg.name}</td></tr>
-            <tr><td style="padding:8px 0;color:#666;">Email</td>
-                <td style="padding:8px 0;"><a href="mailto:{msg.email}">{msg.email}</a></td></tr>
-            <tr><td style="padding:8px 0;color:#666;">Subject</td>
-                <td style="padding:8px 0;">{msg.subject}</td></tr>
-          </table>
-          <hr style="border:none;border-top:1px solid #eee;margin:16px 0;"/>
-          <div style="white-space:pre-wrap;line-height:1.6;">{msg.message}</div>
-          <hr style="border:none;border-top:1px solid #eee;margin:16px 0;"/>
-          <p style="color:#999;font-size:12px;">Sent via pk-portfolio · {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}</p>
-        </body></html>"""
-
-        mime.attach(MIMEText(html_body, "html"))
-
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(SMTP_USER, RECIPIENT_EMAIL, mime.as_string())
-
-        logger.info(f"Email sent from {msg.name} <{msg.email}>")
-        return {"success": True, "message": "Message sent successfully"}
+        fresh = await contact_outbox.submit(OutgoingEmail(
+            sender=SMTP_USER,
+            recipient=RECIPIENT_EMAIL,
+            body=render_contact_email(msg),
+            key=key,
+            label=f"{msg.name} <{msg.email}>",
+        ))
+        logger.info(f"Email {'queued' if fresh else 'already queued (duplicate)'} from {msg.name} <{msg.email}>")
+        return {"success": True, "message": "Message received — delivering now"}
 
     except Exception as e:
-        logger.error(f"SMTP error: {e}")
+        logger.error(f"Contact journal error: {e}")
         raise HTTPException(status_code=500, detail="Failed to send message. Please try again.")
@@ -0,0 +1,176 @@
+"""
+Rolling per-model performance stats for the OpenRouter fallback chains.
+
+Each model keeps bounded windows of its most recent observations — total
+latency, success/error outcomes, time-to-first-token and output tokens/sec for
+streamed calls — plus lifetime attempt/success/failure counts and token usage
+(including prompt tokens served from the provider's prompt cache). The latency
+window drives the hedge delay in hedged fallback mode. Exposed via
+/api/diagnostics.
+"""
+
+import statistics
+import time
+from collections import deque
+
+
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 45.0, float("inf"))
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _summary(values: deque) -> dict | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "n": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(_percentile(ordered, 0.5), 3),
+        "p95": round(_percentile(ordered, 0.95), 3),
+    }
+
+
+class ModelStats:
+    def __init__(self, window: int = 100):
+        self.window = window
+        self.attempts = 0
+        self.successes = 0
+        self.failures = 0
+        self.latency: deque[float] = deque(maxlen=window)         # seconds, full response
+        self.outcomes: deque[bool] = deque(maxlen=window)         # True = success
+        self.recent: deque[tuple[float, bool, float]] = deque(maxlen=window)  # (monotonic ts, ok, latency)
+        self.ttft: deque[float] = deque(maxlen=window)            # seconds, streamed only
+        self.tokens_per_sec: deque[float] = deque(maxlen=window)  # streamed only
+        # Lifetime token usage as reported by OpenRouter
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0   # served from the provider's prompt cache
+        self.cache_write_tokens = 0
+        self.completion_tokens = 0
+
+    def record_success(self, latency: float) -> None:
+        self.attempts += 1
+        self.successes += 1
+        self.latency.append(latency)
+        self.outcomes.append(True)
+        self.recent.append((time.monotonic(), True, latency))
+
+    def record_failure(self) -> None:
+        self.attempts += 1
+        self.failures += 1
+        self.outcomes.append(False)
+        self.recent.append((time.monotonic(), False, 0.0))
+
+    def record_stream(self, ttft: float, total: float, output_tokens: int) -> None:
+        self.record_success(total)
+        self.ttft.append(ttft)
+        generation = total - ttft
+        if output_tokens and generation > 0:
+            self.tokens_per_sec.append(output_tokens / generation)
+
+    def record_usage(self, usage: dict) -> None:
+        """Accumulate an OpenRouter `usage` object (missing fields count as 0)."""
+        details = usage.get("prompt_tokens_details") or {}
+        self.prompt_tokens += usage.get("prompt_tokens") or 0
+        self.completion_tokens += usage.get("completion_tokens") or 0
+        self.cached_prompt_tokens += details.get("cached_tokens") or 0
+        self.cache_write_tokens += details.get("cache_write_tokens") or 0
+
+    def latency_p95(self, min_samples: int = 10) -> float | None:
+        """p95 of recent successful latencies, or None until there's enough data to trust it."""
+        if len(self.latency) < min_samples:
+            return None
+        return _percentile(self.latency, 0.95)
+
+    def recent_health(self, horizon: float) -> tuple[int, float, float]:
+        """(samples, error rate, p50 latency) over the last `horizon` seconds only."""
+        cutoff = time.monotonic() - horizon
+        window = [(ok, lat) for ts, ok, lat in self.recent if ts >= cutoff]
+        if not window:
+            return 0, 0.0, 0.0
+        errors = sum(1 for ok, _ in window if not ok)
+        latencies = [lat for ok, lat in window if ok]
+        return len(window), errors / len(window), (_percentile(latencies, 0.5) if latencies else 0.0)
+
+    @property
+    def error_rate(self) -> float:
+        return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def latency_histogram(self) -> dict[str, int]:
+        counts = dict.fromkeys((f"le_{b}" for b in LATENCY_BUCKETS), 0)
+        for value in self.latency:
+            for b in LATENCY_BUCKETS:
+                if value <= b:
+                    counts[f"le_{b}"] += 1
+                    break
+        return counts
+
+    def snapshot(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 3),
+            "latency_s": _summary(self.latency),
+            "latency_histogram": self.latency_histogram(),
+            "ttft_s": _summary(self.ttft),
+            "tokens_per_sec": _summary(self.tokens_per_sec),
+            "usage": {
+                "prompt_tokens": self.prompt_tokens,
+                "cached_prompt_tokens": self.cached_prompt_tokens,
+                "cache_write_tokens": self.cache_write_tokens,
+                "completion_tokens": self.completion_tokens,
+                "prompt_cache_hit_ratio": (
+                    round(self.cached_prompt_tokens / self.prompt_tokens, 3) if self.prompt_tokens else 0.0
+                ),
+            },
+        }
+
+
+def rank_models(
+    model_list: list[str],
+    stats: "ModelStatsRegistry",
+    error_weight: float = 4.0,
+    latency_weight: float = 0.1,
+    horizon: float = 600.0,
+    min_samples: int = 3,
+) -> list[str]:
+    """
+    Reorder a fallback chain by recent health while keeping the configured order as
+    the baseline: score = position + error_weight·error_rate + latency_weight·p50 seconds.
+    A healthy chain keeps its order; a model erroring half the time drops ~2 places.
+    Only the last `horizon` seconds count, so a demoted model that stops getting
+    traffic drifts back to its configured slot instead of staying buried.
+    """
+    def score(item: tuple[int, str]) -> float:
+        position, model = item
+        s = stats.peek(model)
+        if s is None:
+            return float(position)
+        samples, error_rate, p50 = s.recent_health(horizon)
+        if samples < min_samples:
+            return float(position)
+        return position + error_weight * error_rate + latency_weight * p50
+
+    return [m for _, m in sorted(enumerate(model_list), key=score)]
+
+
+class ModelStatsRegistry:
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._models: dict[str, ModelStats] = {}
+
+    def __getitem__(self, model: str) -> ModelStats:
+        stats = self._models.get(model)
+        if stats is None:
+            stats = self._models[model] = ModelStats(self.window)
+        return stats
+
+    def peek(self, model: str) -> ModelStats | None:
+        return self._models.get(model)
+
+    def snapshot(self) -> dict:
+        return {model: stats.snapshot() for model, stats in self._models.items()}
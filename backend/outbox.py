@@ -0,0 +1,436 @@
+"""
+Durable background delivery for contact-form email.
+
+`/api/contact` renders the message and awaits `ContactOutbox.submit()`, which
+appends it to an on-disk journal (SQLite in WAL mode) and returns as soon as the
+row is committed — the submission survives a crash or restart from that point
+on. A single worker task drains the journal and delivers through one
+long-lived, authenticated SMTP session on a dedicated thread (smtplib is
+blocking), so the event loop never waits on SMTP:
+
+  - at-least-once: a row is only marked delivered after the SMTP server accepts it;
+    rows are leased while in flight, so a crashed worker's batch is retried
+  - duplicate submissions (same content hash) are acknowledged but stored once
+  - messages due together are sent as one batch over the same session
+  - failed sends are retried with exponential backoff; a message that gives up
+    releases its dedupe key, so the visitor can submit it again
+  - delivered and failed rows are compacted away after a retention period
+"""
+
+import asyncio
+import logging
+import smtplib
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    sender: str
+    recipient: str
+    body: str  # full RFC 5322 message (MIME.as_string())
+    key: str   # content hash of the submission, for dedupe
+    label: str = ""  # for logs, e.g. "Name <email>"
+    attempts: int = 0
+    id: int | None = None
+    queued_at: float = field(default_factory=time.time)
+
+
+class SMTPSession:
+    """
+    A reusable SMTP connection. Only ever touched from the outbox's single thread.
+    STARTTLS is mandatory (a server that doesn't offer it fails the connect, so
+    credentials never go out in cleartext); `starttls=False` exists only for the
+    plaintext local sinks used by the benchmarks.
+    """
+
+    def __init__(self, host: str, port: int, user: str = "", password: str = "", timeout: float = 30.0,
+                 idle_check_after: float = 60.0, starttls: bool = True):
+        self.host, self.port = host, port
+        self.starttls = starttls
+        self.user, self.password = user, password
+        self.timeout = timeout
+        self.idle_check_after = idle_check_after
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls:
+            smtp.starttls()  # raises SMTPNotSupportedError if the server (or a MITM) doesn't offer it
+            smtp.ehlo()
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self.connects += 1
+        return smtp
+
+    def _ensure(self) -> smtplib.SMTP:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_check_after:
+            try:
+                if self._smtp.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP failed")
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
+
+    def send(self, email: OutgoingEmail) -> None:
+        """Send one message, reconnecting once if the server dropped the idle session."""
+        with timed("smtp_send"):
+            try:
+                self._ensure().sendmail(email.sender, email.recipient, email.body)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                self._ensure().sendmail(email.sender, email.recipient, email.body)
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+
+class OutboxJournal:
+    """
+    Append-only-ish SQLite journal of outgoing mail. Status moves
+    pending → delivered | failed; `next_attempt_at` doubles as the in-flight lease.
+    Safe to share between processes (WAL + BEGIN IMMEDIATE claims).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id              INTEGER PRIMARY KEY,
+            key             TEXT NOT NULL UNIQUE,
+            sender          TEXT NOT NULL,
+            recipient       TEXT NOT NULL,
+            body            TEXT NOT NULL,
+            label           TEXT NOT NULL DEFAULT '',
+            status          TEXT NOT NULL DEFAULT 'pending',
+            attempts        INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at      REAL NOT NULL,
+            delivered_at    REAL,
+            last_error      TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+    """
+
+    def __init__(self, path: Path | str):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+
+    def open(self) -> None:
+        if self._db is not None:
+            return
+        if str(self.path) != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a commit survives a process crash; only an OS crash can lose the last few
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def append(self, email: OutgoingEmail) -> bool:
+        """Persist a new message. Returns False if the same content is already journaled."""
+        return self.append_many([email])[0]
+
+    def append_many(self, emails: list[OutgoingEmail]) -> list[bool]:
+        """Persist several messages in one transaction (group commit)."""
+        now = time.time()
+        fresh = []
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for email in emails:
+                cur = self._db.execute(
+                    "INSERT OR IGNORE INTO outbox (key, sender, recipient, body, label, next_attempt_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (email.key, email.sender, email.recipient, email.body, email.label, now, now),
+                )
+                fresh.append(cur.rowcount == 1)
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return fresh
+
+    def claim_due(self, limit: int, lease: float) -> list[OutgoingEmail]:
+        """Lease up to `limit` due messages; they won't be handed out again until the lease expires."""
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute(
+                "SELECT id, key, sender, recipient, body, label, attempts, created_at FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE outbox SET next_attempt_at = ? WHERE id = ?", [(now + lease, r[0]) for r in rows]
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return [
+            OutgoingEmail(sender=r[2], recipient=r[3], body=r[4], key=r[1], label=r[5],
+                          attempts=r[6], id=r[0], queued_at=r[7])
+            for r in rows
+        ]
+
+    def next_due_in(self) -> float | None:
+        row = self._db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def mark_delivered(self, ids: list[int]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "UPDATE outbox SET status = 'delivered', delivered_at = ?, last_error = NULL WHERE id = ?",
+            [(now, i) for i in ids],
+        )
+
+    def mark_retry(self, email: OutgoingEmail, delay: float, error: str) -> None:
+        self._db.execute(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (email.attempts, time.time() + delay, error, email.id),
+        )
+
+    def mark_failed(self, email: OutgoingEmail, error: str) -> None:
+        # Suffix the key with the row id: the row stays for inspection, but an identical
+        # resubmission is no longer treated as a duplicate and gets sent
+        self._db.execute(
+            "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ?, key = key || ':failed:' || id "
+            "WHERE id = ?",
+            (email.attempts, error, email.id),
+        )
+
+    def compact(self, retention: float) -> int:
+        """Drop delivered and failed rows older than `retention` seconds and truncate the WAL."""
+        cutoff = time.time() - retention
+        cur = self._db.execute(
+            "DELETE FROM outbox WHERE (status = 'delivered' AND delivered_at < ?) "
+            "OR (status = 'failed' AND created_at < ?)",
+            (cutoff, cutoff),
+        )
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return cur.rowcount
+
+    def counts(self) -> dict[str, int]:
+        counts = {"pending": 0, "delivered": 0, "failed": 0}
+        counts.update(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return counts
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class ContactOutbox:
+    def __init__(
+        self,
+        session: SMTPSession,
+        journal: OutboxJournal,
+        *,
+        batch_size: int = 20,
+        batch_window: float = 0.2,
+        max_attempts: int = 5,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        lease: float = 120.0,
+        retention: float = 86400.0,
+        compact_interval: float = 3600.0,
+    ):
+        self.session = session
+        self.journal = journal
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._smtp_executor: ThreadPoolExecutor | None = None
+        self._db_executor: ThreadPoolExecutor | None = None
+        self._wake = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+        self._appends: list[tuple[OutgoingEmail, asyncio.Future]] = []
+        self._flusher: asyncio.Task | None = None
+        self._last_compact = time.monotonic()
+        self._stopping = False
+        self._drain_deadline = 0.0
+        self.error_backoff_max = 60.0
+        self.counters = {"accepted": 0, "duplicates": 0, "sent": 0, "retried": 0, "failed": 0, "batches": 0,
+                         "worker_errors": 0}
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db_executor, fn, *args)
+
+    # ── producer ─────────────────────────────────────────────────────────────
+    async def submit(self, email: OutgoingEmail) -> bool:
+        """
+        Durably journal a message and wake the worker. Returns False for a duplicate.
+        Concurrent submissions are group-committed: whoever arrives while a commit is
+        in flight joins the next one, so a burst costs a few transactions, not one each.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._appends.append((email, future))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_appends())
+        fresh = await asyncio.shield(future)
+        self.counters["accepted" if fresh else "duplicates"] += 1
+        if fresh:
+            self._wake.set()
+        return fresh
+
+    async def _flush_appends(self) -> None:
+        while self._appends:
+            group, self._appends = self._appends, []
+            try:
+                results = await self._db(self.journal.append_many, [email for email, _ in group])
+            except Exception as e:
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+            for (_, future), fresh in zip(group, results):
+                future.set_result(fresh)
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    def start(self) -> None:
+        if self._worker is None:
+            # One thread owns the SMTP session, one owns the journal, so neither is used concurrently
+            self._smtp_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+            self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox-db")
+            self.journal.open()
+            self._stopping = False
+            self._wake.set()  # pick up anything left over from a previous run
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Let the worker send what is due (for up to drain_timeout) and finish the batch in
+        flight — including marking it delivered — then stop. Anything left stays journaled.
+        """
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._drain_deadline = time.monotonic() + drain_timeout
+        self._wake.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._worker), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            # Stuck mid-send: its rows stay leased and are retried after the lease
+            logger.warning(f"Outbox worker still busy after {drain_timeout:.0f}s — cancelling")
+            self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        pending = (await self._db(self.journal.counts))["pending"]
+        if pending:
+            logger.warning(f"Outbox stopped with {pending} message(s) journaled for the next start")
+        await asyncio.get_running_loop().run_in_executor(self._smtp_executor, self.session.close)
+        await self._db(self.journal.close)
+        self._smtp_executor.shutdown(wait=False)
+        self._db_executor.shutdown(wait=False)
+
+    # ── worker ───────────────────────────────────────────────────────────────
+    def _send_batch(self, batch: list[OutgoingEmail]) -> list[tuple[OutgoingEmail, Exception]]:
+        failures = []
+        for email in batch:
+            try:
+                self.session.send(email)
+            except Exception as e:
+                self.session.close()
+                failures.append((email, e))
+        return failures
+
+    async def _run(self) -> None:
+        """Deliver until stop(); an error (e.g. "database is locked") is logged and retried with backoff."""
+        backoff = 1.0
+        while True:
+            try:
+                if not await self._step():
+                    return
+                backoff = 1.0
+            except Exception as e:
+                self.counters["worker_errors"] += 1
+                if self._stopping:
+                    logger.error(f"Outbox worker error while stopping: {type(e).__name__}: {e}")
+                    return
+                logger.error(f"Outbox worker error: {type(e).__name__}: {e} — retrying in {backoff:.0f}s")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=backoff)  # stop() cuts the wait short
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(self.error_backoff_max, backoff * 2)
+
+    async def _step(self) -> bool:
+        """One pass: wait for due mail, send a batch, mark it. Returns False when it's time to stop."""
+        due_in = await self._db(self.journal.next_due_in)
+        if due_in is None or due_in > 0:
+            if self._stopping:
+                return False
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=min(due_in or 60.0, 60.0))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._stopping:
+                await asyncio.sleep(self.batch_window)  # let a burst accumulate into one batch
+        if self._stopping and time.monotonic() >= self._drain_deadline:
+            return False
+
+        batch = await self._db(self.journal.claim_due, self.batch_size, self.lease)
+        if batch:
+            try:
+                failures = await asyncio.get_running_loop().run_in_executor(
+                    self._smtp_executor, self._send_batch, batch
+                )
+            except Exception as e:  # executor-level failure — treat the whole batch as failed
+                failures = [(email, e) for email in batch]
+            self.counters["batches"] += 1
+            failed = {email.id for email, _ in failures}
+            delivered = [email for email in batch if email.id not in failed]
+            await self._db(self.journal.mark_delivered, [email.id for email in delivered])
+            for email in delivered:
+                self.counters["sent"] += 1
+                logger.info(f"Email sent from {email.label}")
+            for email, error in failures:
+                await self._handle_failure(email, error)
+
+        if time.monotonic() - self._last_compact > self.compact_interval:
+            removed = await self._db(self.journal.compact, self.retention)
+            self._last_compact = time.monotonic()
+            logger.info(f"Outbox compacted {removed} delivered or failed message(s)")
+        return True
+
+    async def _handle_failure(self, email: OutgoingEmail, error: Exception) -> None:
+        email.attempts += 1
+        if email.attempts >= self.max_attempts:
+            self.counters["failed"] += 1
+            await self._db(self.journal.mark_failed, email, str(error))
+            logger.error(f"SMTP error: giving up on message from {email.label} after {email.attempts} attempts: {error}")
+            return
+        delay = min(self.backoff_max, self.backoff_base ** email.attempts)
+        self.counters["retried"] += 1
+        await self._db(self.journal.mark_retry, email, delay, str(error))
+        logger.warning(f"SMTP error: {error} — retrying message from {email.label} in {delay:.0f}s")
+
+    async def stats(self) -> dict:
+        return {
+            **self.counters,
+            "journal": await self._db(self.journal.counts) if self._worker else None,
+            "smtp_connects": self.session.connects,
+        }
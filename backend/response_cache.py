@@ -0,0 +1,177 @@
+"""
+Response cache for Pai chat.
+
+Exact tier: an LRU + TTL map keyed on
+    sha256(normalized question | hash of recent history | context version)
+where the context version changes whenever the data files or the GitHub
+snapshot change, so stale answers are never served after an update.
+
+Semantic tier (optional): for opening questions (no history), a paraphrase of
+an already-answered question is matched by cosine similarity over local
+hashed embeddings (`retrieval.HashingEmbedder`) within the same context version.
+
+With a `shared` cache backend, exact-tier entries are also written there (with
+the same TTL) and looked up on a local miss, so every worker answers a question
+any of them has answered. Shared reads and writes run on executor threads. The
+semantic tier stays per process.
+
+Hit ratio, estimated tokens saved and upstream latency saved are tracked for
+/api/diagnostics.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from cache_backends import run_in_background
+from retrieval import Embedder, HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+def history_fingerprint(history: list[tuple[str, str]]) -> str:
+    h = hashlib.sha256()
+    for role, content in history:
+        h.update(f"{role}\x00{normalize_question(content)}\x01".encode())
+    return h.hexdigest()[:16]
+
+
+@dataclass
+class CachedReply:
+    reply: str
+    model: str
+    created_at: float
+    tokens: int       # estimated prompt + completion tokens the original call cost
+    latency: float    # seconds the original upstream call took
+    version: str
+    vector: np.ndarray | None = None
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 3600.0,
+        semantic: bool = True,
+        semantic_threshold: float = 0.92,
+        embedder: Embedder | None = None,
+        shared=None,
+    ):
+        self.shared = shared
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic = semantic
+        self.semantic_threshold = semantic_threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._entries: OrderedDict[str, CachedReply] = OrderedDict()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0,
+                         "shared_hits": 0}
+        self.tokens_saved = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def key(question: str, history_fp: str, version: str) -> str:
+        return hashlib.sha256(f"{normalize_question(question)}|{history_fp}|{version}".encode()).hexdigest()
+
+    def _alive(self, entry: CachedReply) -> bool:
+        return time.time() - entry.created_at < self.ttl
+
+    async def get(self, question: str, history_fp: str, version: str, allow_semantic: bool) -> tuple[CachedReply, str] | None:
+        """Returns (entry, "exact" | "semantic") or None."""
+        k = self.key(question, history_fp, version)
+        entry = self._entries.get(k)
+        if entry is not None and self._alive(entry):
+            self._entries.move_to_end(k)
+            return self._hit(entry, "exact")
+        if entry is not None:
+            del self._entries[k]
+        entry = await asyncio.to_thread(self._get_shared, k) if self.shared is not None else None
+        if entry is not None:
+            self.counters["shared_hits"] += 1
+            self._entries[k] = entry
+            self._trim()
+            return self._hit(entry, "exact")
+
+        if self.semantic and allow_semantic:
+            match = self._nearest(question, version)
+            if match is not None:
+                return self._hit(match, "semantic")
+
+        self.counters["misses"] += 1
+        return None
+
+    def _get_shared(self, k: str) -> CachedReply | None:
+        try:
+            raw = self.shared.get(f"chat:{k}")
+        except Exception as e:
+            logger.warning(f"Shared chat cache read failed: {e}")
+            return None
+        if not raw:
+            return None
+        entry = CachedReply(**json.loads(raw))
+        return entry if self._alive(entry) else None
+
+    def _hit(self, entry: CachedReply, tier: str) -> tuple[CachedReply, str]:
+        self.counters[f"{tier}_hits"] += 1
+        self.tokens_saved += entry.tokens
+        self.latency_saved += entry.latency
+        return entry, tier
+
+    def _nearest(self, question: str, version: str) -> CachedReply | None:
+        candidates = [e for e in self._entries.values() if e.vector is not None and e.version == version and self._alive(e)]
+        if not candidates:
+            return None
+        q = self.embedder.embed([normalize_question(question)])[0]
+        sims = np.stack([e.vector for e in candidates]) @ q
+        best = int(np.argmax(sims))
+        return candidates[best] if sims[best] >= self.semantic_threshold else None
+
+    def put(self, question: str, history_fp: str, version: str, reply: str, model: str,
+            tokens: int, latency: float, semantic: bool) -> None:
+        vector = self.embedder.embed([normalize_question(question)])[0] if (self.semantic and semantic) else None
+        k = self.key(question, history_fp, version)
+        entry = self._entries[k] = CachedReply(reply, model, time.time(), tokens, latency, version, vector)
+        self._entries.move_to_end(k)
+        if self.shared is not None:
+            payload = {f: getattr(entry, f) for f in ("reply", "model", "created_at", "tokens", "latency", "version")}
+            run_in_background(self._put_shared, k, json.dumps(payload))
+        self.counters["stores"] += 1
+        self._trim()
+
+    def _put_shared(self, k: str, payload: str) -> None:
+        try:
+            self.shared.set(f"chat:{k}", payload, ex=math.ceil(self.ttl))
+        except Exception as e:
+            logger.warning(f"Shared chat cache write failed: {e}")
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        hits = self.counters["exact_hits"] + self.counters["semantic_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "tokens_saved_est": self.tokens_saved,
+            "latency_saved_s": round(self.latency_saved, 1),
+            "shared": self.shared is not None,
+        }
@@ -0,0 +1,194 @@
+"""
+Local retrieval over the RAG documents (journey + resume).
+
+Documents are split into overlapping paragraph-aligned chunks at load time and
+indexed in-process two ways:
+  - BM25 over word tokens (pure Python)
+  - a NumPy cosine index over embeddings from a pluggable local `Embedder`
+    (default: `HashingEmbedder`, feature-hashed unigrams + bigrams — no model download)
+
+`RetrievalIndex.search()` fuses both rankings (reciprocal rank fusion) and
+returns the top-k chunks that fit a token budget, in document order. Chunk
+sizes come from token_budget.count_tokens(), the same counter the chat prompt
+budget uses, so packed excerpts add up to what the prompt packer expects.
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Protocol
+
+import numpy as np
+
+from token_budget import count_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by did do does for from had has have he his how i in is it its "
+    "me my of on or our she so that the their them then there they this to was we were what "
+    "when where which who why will with you your about into than also can".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    id: int
+    source: str
+    position: int  # order within the source document
+    text: str
+    tokens: int
+
+
+def chunk_text(text: str, max_chars: int = 1200, overlap: int = 200) -> list[str]:
+    """Split on blank lines, pack paragraphs up to max_chars, carry a tail overlap between chunks."""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    chunks: list[str] = []
+    current = ""
+    for para in paragraphs:
+        # Hard-split paragraphs that are longer than a chunk on their own
+        while len(para) > max_chars:
+            cut = para.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces, para = para[:cut], para[cut:].lstrip()
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(pieces)
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            tail = tail[tail.find(" ") + 1:] if " " in tail else tail
+            current = f"{tail}\n\n{para}" if tail else para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ─── Embedders ────────────────────────────────────────────────────────────────
+class Embedder(Protocol):
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return an (n, dim) float32 array of L2-normalized vectors."""
+        ...
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of unigrams + bigrams. Deterministic, dependency-free beyond NumPy."""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> tuple[int, float]:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        return h % self.dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = tokenize(text)
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature, count in Counter(features).items():
+                idx, sign = self._bucket(feature)
+                out[i, idx] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+# ─── Indexes ──────────────────────────────────────────────────────────────────
+class BM25Index:
+    def __init__(self, docs: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.doc_terms = [Counter(tokenize(d)) for d in docs]
+        self.doc_lens = [sum(t.values()) for t in self.doc_terms]
+        self.avg_len = (sum(self.doc_lens) / len(self.doc_lens)) if docs else 0.0
+        df: Counter = Counter()
+        for terms in self.doc_terms:
+            df.update(terms.keys())
+        n = len(docs)
+        self.idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def scores(self, query: str) -> list[float]:
+        q_terms = set(tokenize(query))
+        scores = []
+        for terms, length in zip(self.doc_terms, self.doc_lens):
+            s = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_len or 1.0))
+            for t in q_terms:
+                tf = terms.get(t)
+                if tf:
+                    s += self.idf[t] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(s)
+        return scores
+
+
+class VectorIndex:
+    def __init__(self, docs: list[str], embedder: Embedder):
+        self.embedder = embedder
+        self.matrix = embedder.embed(docs) if docs else np.zeros((0, embedder.dim), dtype=np.float32)
+
+    def scores(self, query: str) -> list[float]:
+        if not len(self.matrix):
+            return []
+        q = self.embedder.embed([query])[0]
+        return (self.matrix @ q).tolist()
+
+
+class RetrievalIndex:
+    """Chunked, hybrid (BM25 + vector) index over a set of named documents."""
+
+    def __init__(
+        self,
+        documents: dict[str, str],
+        *,
+        mode: str = "hybrid",          # "bm25" | "vector" | "hybrid"
+        embedder: Embedder | None = None,
+        chunk_chars: int = 1200,
+        chunk_overlap: int = 200,
+    ):
+        self.mode = mode
+        self.chunks: list[Chunk] = []
+        for source, text in documents.items():
+            for pos, piece in enumerate(chunk_text(text, chunk_chars, chunk_overlap)):
+                self.chunks.append(Chunk(len(self.chunks), source, pos, piece, count_tokens(piece)))
+        texts = [c.text for c in self.chunks]
+        self.bm25 = BM25Index(texts) if mode in ("bm25", "hybrid") else None
+        self.vectors = VectorIndex(texts, embedder or HashingEmbedder()) if mode in ("vector", "hybrid") else None
+
+    def _ranked(self, scores: list[float]) -> list[int]:
+        return [i for i in sorted(range(len(scores)), key=lambda i: -scores[i]) if scores[i] > 0]
+
+    def search(self, query: str, k: int = 8, token_budget: int = 6000) -> list[Chunk]:
+        """Top-k chunks by reciprocal-rank fusion, greedily packed under token_budget, in document order."""
+        fused: dict[int, float] = {}
+        for index in (self.bm25, self.vectors):
+            if index is None:
+                continue
+            for rank, i in enumerate(self._ranked(index.scores(query))):
+                fused[i] = fused.get(i, 0.0) + 1.0 / (60 + rank)
+
+        selected: list[Chunk] = []
+        used = 0
+        for i in sorted(fused, key=lambda i: -fused[i]):
+            chunk = self.chunks[i]
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+            if len(selected) >= k:
+                break
+        return sorted(selected, key=lambda c: c.id)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(c.tokens for c in self.chunks)
@@ -0,0 +1,131 @@
+"""
+Token budgeting for chat prompts.
+
+`count_tokens()` uses tiktoken's o200k_base encoding when the optional
+`tiktoken` package is installed, and otherwise a local approximation of BPE
+tokenizers: short words are one token, longer words one per ~4 extra
+characters, punctuation one each, non-ASCII characters (emoji, accents) one
+each. It errs slightly high on English prose, which is the safe direction for
+budgeting.
+
+History is packed newest-first into a token budget; turns that don't fit are
+folded into a short extractive summary instead of being sent verbatim.
+`fit_messages()` then makes a packed prompt fit one specific model's context
+window (dropping the oldest history first) and clamps max_tokens to what's left.
+"""
+
+import math
+import re
+
+try:
+    import tiktoken  # optional dependency
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+_PIECE_RE = re.compile(r"[A-Za-z0-9_]+|[^\sA-Za-z0-9_]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+MESSAGE_OVERHEAD = 4  # role + delimiters per chat message
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        tokens += 1 + max(0, len(piece) - 4) // 4 if piece.isascii() else len(piece)
+    return tokens
+
+
+def message_tokens(message: dict) -> int:
+    content = message["content"]
+    if not isinstance(content, str):
+        content = "".join(part.get("text", "") for part in content)
+    return count_tokens(content) + MESSAGE_OVERHEAD
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """Cut `text` to roughly `limit` tokens, marking the cut."""
+    n = count_tokens(text)
+    if n <= limit:
+        return text
+    keep = max(0, math.floor(len(text) * limit / n) - 2)
+    return text[:keep].rstrip() + " …"
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    return truncate_tokens(_SENTENCE_RE.split(text.strip(), maxsplit=1)[0], limit)
+
+
+def summarize_turns(turns: list[tuple[str, str]], budget: int) -> str:
+    """Extractive summary of dropped turns: the first sentence of each, newest kept first."""
+    lines: list[str] = []
+    used = 0
+    for role, content in reversed(turns):
+        who = "Visitor asked" if role == "user" else "Pai answered"
+        line = f"- {who}: {_first_sentence(content, 40)}"
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(reversed(lines))
+
+
+def pack_history(
+    history: list[tuple[str, str]],
+    budget: int,
+    max_message_tokens: int = 1500,
+    summary_budget: int = 300,
+) -> tuple[list[tuple[str, str]], str]:
+    """
+    Keep the newest turns that fit `budget` tokens (each capped at
+    `max_message_tokens`). Returns (kept turns, summary of the dropped ones or "").
+    """
+    kept: list[tuple[str, str]] = []
+    used = 0
+    for role, content in reversed(history):
+        content = truncate_tokens(content, max_message_tokens)
+        cost = count_tokens(content) + MESSAGE_OVERHEAD
+        if used + cost > budget:
+            break
+        kept.append((role, content))
+        used += cost
+    kept.reverse()
+    if len(kept) < len(history):
+        # Don't open mid-exchange on an orphaned answer; it goes into the summary instead
+        while kept and kept[0][0] == "assistant":
+            kept.pop(0)
+    dropped = history[: len(history) - len(kept)]
+    return kept, (summarize_turns(dropped, summary_budget) if dropped else "")
+
+
+def fit_messages(
+    messages: list[dict],
+    context_window: int,
+    max_tokens: int,
+    min_output: int = 512,
+    safety: float = 0.9,
+) -> tuple[list[dict], int]:
+    """
+    Make `messages` + `max_tokens` fit a model's context window. The system
+    message(s) and the final message are always kept; history in between is
+    dropped oldest-first. max_tokens is clamped to the space left, but never
+    below `min_output`.
+    """
+    window = int(context_window * safety)
+    costs = [message_tokens(m) for m in messages]
+    total = sum(costs)
+    if total + max_tokens <= window:
+        return messages, max_tokens
+
+    head = 0
+    while head < len(messages) - 1 and messages[head]["role"] == "system":
+        head += 1
+    drop = head
+    while drop < len(messages) - 1 and (total + min_output > window or messages[drop]["role"] == "assistant"):
+        total -= costs[drop]
+        drop += 1
+    fitted = messages[:head] + messages[drop:]
+    return fitted, max(min_output, min(max_tokens, window - total))
@@ -0,0 +1,121 @@
+"""
+Pooled HTTP clients for upstream APIs (OpenRouter, GitHub).
+
+One httpx.AsyncClient per upstream host, created once in the FastAPI lifespan
+and shared by every request, so TCP + TLS handshakes are paid once per
+connection instead of once per call. Connection reuse is measured through
+httpcore's trace hooks and surfaced via `UpstreamPool.stats()`.
+"""
+
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamPool:
+    """A long-lived, keep-alive (optionally HTTP/2) client for a single upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        *,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 45.0,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._client: httpx.AsyncClient | None = None
+        self._requests = 0
+        self._tcp_connects = 0
+        self._tls_handshakes = 0
+        self._warmed = False
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+            event_hooks={"request": [self._on_request]},
+        )
+        logger.info(f"[{self.name}] pool started (http2={self.http2}, limits={self.limits})")
+
+    async def warm(self, url: str | None = None, timeout: float = 5.0) -> bool:
+        """
+        Open a connection ahead of the first real request (TCP + TLS + HTTP/2 setup).
+        Any HTTP response counts — only the connection matters — so a HEAD on an
+        endpoint that rejects it is fine. Returns False if the upstream was unreachable.
+        """
+        try:
+            await self.client.head(url or self.base_url, timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"[{self.name}] warm-up failed: {type(e).__name__}: {e}")
+            return False
+        self._warmed = True
+        return True
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        logger.info(f"[{self.name}] pool closed")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"Upstream pool '{self.name}' is not started")
+        return self._client
+
+    # ── instrumentation ──────────────────────────────────────────────────────
+    async def _on_request(self, request: httpx.Request) -> None:
+        self._requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._tcp_connects += 1
+        elif event_name == "connection.start_tls.complete":
+            self._tls_handshakes += 1
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage. `handshakes_saved` = requests served on a reused connection."""
+        in_use = idle = 0
+        transport = getattr(self._client, "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        for conn in getattr(pool, "connections", []):
+            if conn.is_closed():
+                continue
+            if conn.is_idle():
+                idle += 1
+            else:
+                in_use += 1
+        return {
+            "started": self._client is not None,
+            "http2": self.http2,
+            "warmed": self._warmed,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "in_use": in_use,
+            "idle": idle,
+            "requests": self._requests,
+            "tcp_connects": self._tcp_connects,
+            "tls_handshakes": self._tls_handshakes,
+            "handshakes_saved": max(0, self._requests - self._tcp_connects),
+        }